@@ -0,0 +1,209 @@
+"""
+Cold starts of the HTTP routes: one function per route vs. the single router
+function (src/handlers/http/api.py, HTTP_ROUTER=single).
+
+Latency is measured in fresh interpreters: a cold container imports the
+route's handler (or the router plus that handler) and builds the DynamoDB
+client every HTTP route uses; in a warm router container, the first request
+of another route only pays that handler's import. Frequency comes from
+replaying synthetic Poisson traffic through a simple container model: a
+container serves one request at a time and is reclaimed after
+--keep-alive-minutes idle.
+
+    python -m benchmarks.bench_cold_starts [--rpm 20] [--hours 4] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from src.handlers.http.api import ROUTES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Share of HTTP traffic per route: screens poll changes and orders, kitchen
+# staff complete stages, everything else is occasional.
+ROUTE_WEIGHTS = {
+    "GET /tenants/{tenantId}/orders/changes": 0.35,
+    "POST /tenants/{tenantId}/orders/{orderId}/stages/{stage}/complete": 0.2,
+    "POST /tenants/{tenantId}/orders": 0.15,
+    "GET /tenants/{tenantId}/orders": 0.1,
+    "GET /tenants/{tenantId}/products": 0.06,
+    "GET /tenants/{tenantId}/stats": 0.05,
+    "GET /tenants/{tenantId}/orders/{orderId}": 0.03,
+    "POST /tenants/{tenantId}/orders/stages/{stage}/complete": 0.03,
+    "POST /tenants/{tenantId}/auth/login": 0.015,
+    "POST /tenants/{tenantId}/products": 0.01,
+    "POST /tenants/{tenantId}/auth/register": 0.004,
+    "POST /tenants": 0.001,
+    "POST /tenants/{tenantId}/exports": 0.001,
+    "GET /tenants/{tenantId}/exports/{exportId}": 0.002,
+}
+PRIMER_ROUTE = "POST /tenants/{tenantId}/orders"
+
+_ENV = {"KFC_BACKEND": "aws", "AWS_DEFAULT_REGION": "us-east-1", "METRICS_MODE": "off"}
+
+_COLD_SPLIT = """
+import time
+started = time.perf_counter()
+import {module}
+from src.common.clients import get_resource
+get_resource("dynamodb")
+print(time.perf_counter() - started)
+"""
+
+_COLD_SINGLE = """
+import time
+started = time.perf_counter()
+from src.handlers.http import api
+api.route_handler({route_key!r})
+from src.common.clients import get_resource
+get_resource("dynamodb")
+print(time.perf_counter() - started)
+"""
+
+_FIRST_USE = """
+import time
+from src.handlers.http import api
+from src.common.clients import get_resource
+api.route_handler({primer!r})
+get_resource("dynamodb")
+started = time.perf_counter()
+api.route_handler({route_key!r})
+print(time.perf_counter() - started)
+"""
+
+
+def _probe(code: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env={**os.environ, **_ENV},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(float(out) * 1000)
+    return statistics.median(samples)
+
+
+def measure_latency(repeat: int) -> dict:
+    """Median ms per route: cold (split), cold (single) and first use in a warm router."""
+    latency = {}
+    for route_key, module in ROUTES.items():
+        latency[route_key] = {
+            "coldSplitMs": _probe(_COLD_SPLIT.format(module=module), repeat),
+            "coldSingleMs": _probe(_COLD_SINGLE.format(route_key=route_key), repeat),
+            "firstUseMs": (
+                0.0 if route_key == PRIMER_ROUTE
+                else _probe(_FIRST_USE.format(primer=PRIMER_ROUTE, route_key=route_key), repeat)
+            ),
+        }
+    return latency
+
+
+def traffic(rpm: float, hours: float, rng: random.Random) -> list[tuple[float, str]]:
+    """(arrival second, routeKey) pairs, Poisson per route."""
+    requests = []
+    end = hours * 3600
+    for route_key, weight in ROUTE_WEIGHTS.items():
+        rate = rpm * weight / 60
+        at = rng.expovariate(rate)
+        while at < end:
+            requests.append((at, route_key))
+            at += rng.expovariate(rate)
+    return sorted(requests)
+
+
+def simulate(requests, latency: dict, single: bool, keep_alive: float, duration: float) -> dict:
+    # function -> containers [{"freeAt", "routes"}]; one function per route unless single.
+    functions: dict[str, list[dict]] = {}
+    stats = {route_key: {"requests": 0, "coldStarts": 0, "firstUses": 0, "initMs": []} for route_key in ROUTES}
+    for at, route_key in requests:
+        containers = functions.setdefault("http" if single else route_key, [])
+        containers[:] = [c for c in containers if at - c["freeAt"] <= keep_alive]
+        idle = [c for c in containers if c["freeAt"] <= at]
+        row = stats[route_key]
+        row["requests"] += 1
+        init_ms = 0.0
+        if idle:
+            container = max(idle, key=lambda c: c["freeAt"])
+            if route_key not in container["routes"]:
+                row["firstUses"] += 1
+                init_ms = latency[route_key]["firstUseMs"]
+        else:
+            container = {"routes": set()}
+            containers.append(container)
+            row["coldStarts"] += 1
+            init_ms = latency[route_key]["coldSingleMs" if single else "coldSplitMs"]
+        container["routes"].add(route_key)
+        container["freeAt"] = at + duration + init_ms / 1000
+        row["initMs"].append(init_ms)
+    return stats
+
+
+def summarize(stats: dict) -> dict:
+    report = {}
+    for route_key, row in stats.items():
+        n = row["requests"] or 1
+        report[route_key] = {
+            "requests": row["requests"],
+            "coldStarts": row["coldStarts"],
+            "coldPct": round(100 * row["coldStarts"] / n, 2),
+            "firstUses": row["firstUses"],
+            "avgInitMs": round(sum(row["initMs"]) / n, 2),
+        }
+    total = sum(r["requests"] for r in stats.values()) or 1
+    report["total"] = {
+        "requests": total,
+        "coldStarts": sum(r["coldStarts"] for r in stats.values()),
+        "coldPct": round(100 * sum(r["coldStarts"] for r in stats.values()) / total, 2),
+        "firstUses": sum(r["firstUses"] for r in stats.values()),
+        "avgInitMs": round(sum(sum(r["initMs"]) for r in stats.values()) / total, 2),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rpm", type=float, default=20, help="HTTP requests per minute, all routes")
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--keep-alive-minutes", type=float, default=7)
+    parser.add_argument("--duration-ms", type=float, default=60, help="warm request duration")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per latency probe")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    latency = measure_latency(args.repeat)
+    requests = traffic(args.rpm, args.hours, random.Random(args.seed))
+    modes = {
+        mode: summarize(simulate(requests, latency, mode == "single", args.keep_alive_minutes * 60, args.duration_ms / 1000))
+        for mode in ("split", "single")
+    }
+    if args.json:
+        print(json.dumps({"latency": latency, "modes": modes}, indent=2))
+        return
+
+    print(f"{'route':<66}{'cold split':>11}{'cold single':>12}{'first use':>10}")
+    for route_key, row in latency.items():
+        print(f"{route_key:<66}{row['coldSplitMs']:>9.1f}ms{row['coldSingleMs']:>10.1f}ms{row['firstUseMs']:>8.1f}ms")
+    print()
+    print(f"{'route':<66}{'n':>6}{'split cold%':>12}{'single cold%':>13}{'split init':>12}{'single init':>12}")
+    for route_key in [*ROUTE_WEIGHTS, "total"]:
+        split, single = modes["split"][route_key], modes["single"][route_key]
+        print(
+            f"{route_key:<66}{split['requests']:>6}{split['coldPct']:>11.2f}%{single['coldPct']:>12.2f}%"
+            f"{split['avgInitMs']:>10.2f}ms{single['avgInitMs']:>10.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: src.common.encoding vs the previous json_dumps/to_decimal.
+
+    python -m benchmarks.bench_encoding [--number 2000]
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+from src.common import encoding
+
+
+def legacy_to_decimal(value):
+    if isinstance(value, list):
+        return [legacy_to_decimal(v) for v in value]
+    if isinstance(value, dict):
+        return {k: legacy_to_decimal(v) for k, v in value.items()}
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
+
+
+def legacy_json_dumps(obj) -> str:
+    def _convert(o):
+        if isinstance(o, (datetime,)):
+            return o.isoformat()
+        if isinstance(o, Decimal):
+            return float(o)
+        return str(o)
+
+    return json.dumps(obj, default=_convert)
+
+
+def order_payload(lines: int = 12, numeric=Decimal) -> dict:
+    items = [
+        {
+            "productId": f"prod_{i:012x}",
+            "name": f"Bucket combo {i}",
+            "price": numeric("24.90"),
+            "quantity": 2 if numeric is float else numeric("2"),
+            "lineTotal": numeric("49.80"),
+        }
+        for i in range(lines)
+    ]
+    stage = {
+        "status": "completed",
+        "startedAt": "2026-10-17T12:00:00+00:00",
+        "completedAt": "2026-10-17T12:09:00+00:00",
+        "actor": "kitchen",
+    }
+    return {
+        "tenantId": "tenant_5f1c2a9e0b7d",
+        "orderId": "order_01m55enfn9a2gha4mag2tk19qg",
+        "status": "delivered",
+        "items": items,
+        "customer": {"name": "Ana", "phone": "+51 999 999 999"},
+        "notes": "sin hielo",
+        "totalAmount": numeric("597.60"),
+        "workflow": {"kitchen": stage, "packaging": dict(stage), "delivery": dict(stage)},
+        "createdAt": "2026-10-17T12:00:00+00:00",
+        "updatedAt": "2026-10-17T12:30:00+00:00",
+    }
+
+
+def catalog_payload(products: int = 200) -> dict:
+    return {
+        "items": [
+            {
+                "tenantId": "tenant_5f1c2a9e0b7d",
+                "productId": f"prod_{i:012x}",
+                "name": f"Producto {i}",
+                "description": "Pieza de pollo crujiente con receta original",
+                "price": Decimal("12.50"),
+                "stock": Decimal(150),
+                "createdAt": "2026-10-17T12:00:00+00:00",
+                "updatedAt": "2026-10-17T12:00:00+00:00",
+            }
+            for i in range(products)
+        ]
+    }
+
+
+def _run(label: str, fn, number: int):
+    per_call = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<34} {per_call * 1e6:9.1f} us")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    stdlib_dumps = encoding._stdlib_encoder.encode
+    print(f"encoding backend: {encoding.BACKEND}")
+    for name, payload in (
+        ("order (12 lines)", order_payload()),
+        ("order (60 lines)", order_payload(60)),
+        ("catalog (200 products)", catalog_payload()),
+    ):
+        print(f"serialize {name}")
+        base = _run("legacy json_dumps", lambda: legacy_json_dumps(payload), args.number)
+        _run("encoding.dumps (stdlib)", lambda: stdlib_dumps(payload), args.number)
+        new = _run(f"encoding.dumps ({encoding.BACKEND})", lambda: encoding.dumps(payload), args.number)
+        print(f"  speedup x{base / new:.2f}")
+
+    for name, payload in (
+        ("order write (floats)", order_payload(numeric=float)),
+        ("order write (no floats)", order_payload(numeric=str)),
+    ):
+        print(f"prepare {name}")
+        base = _run("legacy to_decimal", lambda: legacy_to_decimal(payload), args.number)
+        new = _run("encoding.to_dynamo", lambda: encoding.to_dynamo(payload), args.number)
+        print(f"  speedup x{base / new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
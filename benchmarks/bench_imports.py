@@ -0,0 +1,75 @@
+"""
+Import-time (cold start) benchmark for every handler module.
+
+Each module is imported in a fresh interpreter, the way a Lambda cold start
+would, and the median import time is reported together with whether boto3
+got loaded.
+
+    python -m benchmarks.bench_imports [--repeat 5] [--json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(elapsed, "boto3" in sys.modules)
+"""
+
+
+def handler_modules() -> list[str]:
+    # Not every handler folder is a regular package, so walk the tree.
+    return sorted(
+        ".".join(path.relative_to(ROOT).with_suffix("").parts)
+        for path in (ROOT / "src" / "handlers").rglob("*.py")
+        if path.name != "__init__.py"
+    )
+
+
+def measure(module: str, repeat: int) -> dict:
+    samples = []
+    loads_boto3 = False
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        samples.append(float(out[0]) * 1000)
+        loads_boto3 = out[1] == "True"
+    return {
+        "module": module,
+        "medianMs": round(statistics.median(samples), 2),
+        "minMs": round(min(samples), 2),
+        "loadsBoto3": loads_boto3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = [measure(module, args.repeat) for module in handler_modules()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'module':<45} {'median ms':>10} {'min ms':>8}  boto3")
+    for r in results:
+        print(f"{r['module']:<45} {r['medianMs']:>10.1f} {r['minMs']:>8.1f}  {'yes' if r['loadsBoto3'] else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+End-to-end benchmark of the order lifecycle handlers on the in-memory backend.
+
+Synthetic multi-tenant traffic goes through create_order, the workers
+(process_stage), complete_stage, the events router, the notifier, the stats
+updater, list_orders and get_stats. For each handler it reports p50/p95/p99 latency,
+AWS calls per invocation and peak allocated KB per invocation (measured in a
+separate tracemalloc pass so it does not distort latency).
+
+    python -m benchmarks.bench_lifecycle                       # print report
+    python -m benchmarks.bench_lifecycle --save-baseline       # refresh baseline
+    python -m benchmarks.bench_lifecycle --check               # fail on p95 / AWS call regressions
+    python -m benchmarks.bench_lifecycle --breakdown           # + time per AWS operation
+
+--breakdown prints the local summary of src/common/metrics.py: where each
+handler spends its time, per `service.operation`. The baseline records the
+traffic parameters; --check refuses to compare runs with other parameters.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ["KFC_BACKEND"] = "memory"
+
+from src.common import memory_backend, metrics  # noqa: E402
+from src.handlers.events import router  # noqa: E402
+from src.handlers.orders import complete_stage, create_order, list_orders  # noqa: E402
+from src.handlers.products import create_product  # noqa: E402
+from src.handlers.stats import get_stats  # noqa: E402
+from src.handlers.tenants import register  # noqa: E402
+from src.handlers.ws import connect  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "lifecycle.json"
+ROLES = ("kitchen", "packaging", "delivery", "admin", "customer")
+HANDLER_LABELS = {
+    memory_backend.ROUTER_HANDLER: "router",
+    memory_backend.STATS_HANDLER: "stats_updater",
+    memory_backend.NOTIFIER_HANDLER: "notifier",
+    **{path: "process_stage" for path in memory_backend.QUEUE_HANDLERS.values()},
+}
+
+
+class Recorder:
+    def __init__(self, backend):
+        self.backend = backend
+        self.samples: dict[str, list[tuple[float, int]]] = {}
+        self.memory: dict[str, list[int]] = {}
+        self.trace = False
+
+    def call(self, label: str, fn, *args):
+        calls_before = sum(self.backend.calls.values())
+        if self.trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        if self.trace:
+            self.memory.setdefault(label, []).append(tracemalloc.get_traced_memory()[1] - base)
+        else:
+            calls = sum(self.backend.calls.values()) - calls_before
+            self.samples.setdefault(label, []).append((elapsed, calls))
+        return result
+
+    def invoke(self, handler_path: str, event: dict):
+        label = HANDLER_LABELS.get(handler_path, handler_path)
+        return self.call(label, memory_backend._invoke, handler_path, event)
+
+
+def _body(result) -> dict:
+    return json.loads(result["body"])
+
+
+def seed(tenants: int, products: int, screens: int, rng: random.Random) -> dict:
+    catalog = {}
+    for t in range(tenants):
+        tenant_id = _body(register.handler({"body": json.dumps({"name": f"KFC {t}"})}, None))["tenantId"]
+        catalog[tenant_id] = [
+            _body(
+                create_product.handler(
+                    {
+                        "pathParameters": {"tenantId": tenant_id},
+                        "body": json.dumps(
+                            {"name": f"Producto {p}", "price": round(rng.uniform(3, 40), 2), "stock": 10**9}
+                        ),
+                    },
+                    None,
+                )
+            )["productId"]
+            for p in range(products)
+        ]
+        for s in range(screens):
+            connect.handler(
+                {
+                    "queryStringParameters": {"tenantId": tenant_id, "role": ROLES[s % len(ROLES)]},
+                    "requestContext": {"connectionId": f"{tenant_id}-screen-{s}"},
+                },
+                None,
+            )
+    return catalog
+
+
+def order_event(tenant_id: str, products: list, rng: random.Random) -> dict:
+    lines = [
+        {"productId": product_id, "quantity": rng.randint(1, 3)}
+        for product_id in rng.sample(products, rng.randint(1, min(12, len(products))))
+    ]
+    return {
+        "pathParameters": {"tenantId": tenant_id},
+        "body": json.dumps({"customer": {"name": "Cliente"}, "items": lines}),
+    }
+
+
+def run(args, recorder: Recorder, backend, catalog: dict, rng: random.Random):
+    tenants = list(catalog)
+    order_ids = []
+    for _ in range(args.orders):
+        tenant_id = rng.choice(tenants)
+        result = recorder.call("create_order", create_order.handler, order_event(tenant_id, catalog[tenant_id], rng), None)
+        order_ids.append((tenant_id, _body(result)["orderId"]))
+    backend.drain()
+
+    for stage in memory_backend.WORKFLOW_STAGES:
+        for tenant_id, order_id in order_ids:
+            recorder.call(
+                "complete_stage",
+                complete_stage.handler,
+                {"pathParameters": {"tenantId": tenant_id, "orderId": order_id, "stage": stage}},
+                None,
+            )
+        backend.drain()
+
+    for i in range(args.lists):
+        params = {"limit": "50"}
+        if i % 2:
+            params["status"] = "delivered"
+        recorder.call(
+            "list_orders",
+            list_orders.handler,
+            {"pathParameters": {"tenantId": rng.choice(tenants)}, "queryStringParameters": params},
+            None,
+        )
+        recorder.call("get_stats", get_stats.handler, {"pathParameters": {"tenantId": rng.choice(tenants)}}, None)
+
+    # Router invocations outside the pipeline, for a steady sample size.
+    for tenant_id, order_id in order_ids[: args.lists]:
+        recorder.call(
+            "router",
+            router.handler,
+            {"detail-type": "order.stage.started", "detail": {"tenantId": tenant_id, "orderId": order_id, "stage": "kitchen"}},
+            None,
+        )
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder) -> dict:
+    report = {}
+    for label, samples in sorted(recorder.samples.items()):
+        latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+        memory = recorder.memory.get(label) or [0]
+        report[label] = {
+            "invocations": len(samples),
+            "p50Ms": round(percentile(latencies, 50), 3),
+            "p95Ms": round(percentile(latencies, 95), 3),
+            "p99Ms": round(percentile(latencies, 99), 3),
+            "awsCallsPerInvocation": round(statistics.mean(calls for _, calls in samples), 2),
+            "peakKbPerInvocation": round(statistics.mean(memory) / 1024, 1),
+        }
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_delta_ms: float, calls_threshold: float) -> list[str]:
+    regressions = []
+    for label, current in report.items():
+        previous = baseline.get("handlers", {}).get(label)
+        if not previous:
+            continue
+        # Sub-millisecond p95s jitter by more than the threshold from run to run.
+        slowdown = current["p95Ms"] - previous["p95Ms"]
+        if slowdown > previous["p95Ms"] * threshold and slowdown > min_delta_ms:
+            regressions.append(f"{label}: p95 {previous['p95Ms']}ms -> {current['p95Ms']}ms")
+        # Wall-clock TTL caches (connections, catalog) expire at slightly
+        # different points of each run, so call counts move by a hair too.
+        if current["awsCallsPerInvocation"] > previous["awsCallsPerInvocation"] * (1 + calls_threshold):
+            regressions.append(
+                f"{label}: AWS calls {previous['awsCallsPerInvocation']} -> {current['awsCallsPerInvocation']}"
+            )
+    return regressions
+
+
+def print_breakdown(breakdown: dict):
+    for label, row in breakdown.items():
+        print(
+            f"\n{label}: {row['invocations']} invocations, avg {row['avgMs']:.3f} ms"
+            f" ({row['avgAwsMs']:.3f} ms in AWS calls), {row['avgRequestBytes']} B in / {row['avgResponseBytes']} B out"
+        )
+        for operation, op in row["aws"].items():
+            print(f"  {operation:<40}{op['callsPerInvocation']:>8.2f} calls{op['avgMs']:>10.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--products", type=int, default=30)
+    parser.add_argument("--screens", type=int, default=10, help="WebSocket connections per tenant")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--lists", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a handler regressed past --threshold")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.25, help="p95 slowdowns below this never count")
+    parser.add_argument(
+        "--calls-threshold", type=float, default=0.01, help="allowed rise in AWS calls per invocation (0.01 = 1%%)"
+    )
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--breakdown", action="store_true", help="print AWS time per operation for each handler")
+    args = parser.parse_args()
+
+    recorder = None
+    breakdown = None
+    for trace in (False, True):
+        rng = random.Random(args.seed)
+        backend = memory_backend.reset_backend()
+        catalog = seed(args.tenants, args.products, args.screens, rng)
+        backend.calls.clear()
+        recorder = recorder or Recorder(backend)
+        recorder.backend = backend
+        recorder.trace = trace
+        backend.invoke = recorder.invoke
+        metrics.reset()
+        if trace:
+            tracemalloc.start()
+        run(args, recorder, backend, catalog, rng)
+        if trace:
+            tracemalloc.stop()
+        else:
+            breakdown = metrics.summary()
+
+    report = summarize(recorder)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'handler':<16}{'n':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'AWS calls':>11}{'peak KB':>9}")
+        for label, row in report.items():
+            print(
+                f"{label:<16}{row['invocations']:>7}{row['p50Ms']:>9.3f}{row['p95Ms']:>9.3f}"
+                f"{row['p99Ms']:>9.3f}{row['awsCallsPerInvocation']:>11.2f}{row['peakKbPerInvocation']:>9.1f}"
+            )
+
+    if args.breakdown:
+        print_breakdown(breakdown)
+
+    params = {k: getattr(args, k) for k in ("tenants", "products", "screens", "orders", "lists", "seed")}
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"params": params, "handlers": report}, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            sys.exit(f"no baseline at {args.baseline}; run with --save-baseline first")
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("params") != params:
+            # Other traffic means other latencies and call counts; not comparable.
+            sys.exit(f"baseline was recorded with {baseline.get('params')}, this run used {params}")
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms, args.calls_threshold)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -65,8 +65,9 @@ export const apiService = {
   },
 
   listProducts: async (tenantId: string): Promise<Product[]> => {
+    // The plain menu has no stock; these screens show it.
     const result = await fetchAPI<{ items: Product[] }>(
-      API_CONFIG.endpoints.listProducts(tenantId),
+      `${API_CONFIG.endpoints.listProducts(tenantId)}?stock=true`,
       { method: "GET" }
     );
     return result.items || [];
@@ -117,13 +118,11 @@ export const apiService = {
 
   login: async (
     tenantId: string,
-    data: { email: string; password: string },
-    secret?: string
+    data: { email: string; password: string }
   ): Promise<AuthResponse> => {
     return fetchAPI<AuthResponse>(API_CONFIG.endpoints.login(tenantId), {
       method: "POST",
       body: JSON.stringify(data),
-      headers: secret ? { "x-auth-secret": secret } : {},
     });
   },
 };
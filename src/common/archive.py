@@ -0,0 +1,191 @@
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from src.common.clients import get_client
+from src.common.utils import json_dumps, new_sortable_id, now_iso, sortable_id_time
+
+# Cold tier for orders in final status (see src/handlers/orders/archive_orders.py).
+# Orders are stored in gzip'd JSON-lines batches, partitioned Hive-style so
+# Athena/Glue can read them as a table:
+#   archive/orders/tenant=<tenantId>/date=<YYYY-MM-DD>/<batchId>.jsonl.gz
+# Every tenant has one manifest per order-id day listing that day's batches
+# with their orderId range. get_order reads the day from the (time-sortable)
+# order id, so a lookup only ever loads one small manifest:
+#   archive/orders/tenant=<tenantId>/manifests/<YYYY-MM-DD>.json
+# Orders with legacy `order_<hex12>` ids carry no time and are listed in
+#   archive/orders/tenant=<tenantId>/manifests/legacy.json
+ARCHIVE_PREFIX = "archive/orders"
+# Orders in a final status not updated for this long are moved here; the
+# orders table only holds complete data for orders created since.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+LEGACY_MANIFEST = "legacy"
+ARCHIVE_MANIFEST_TTL_SECONDS = float(os.environ.get("ARCHIVE_MANIFEST_TTL_SECONDS", "60"))
+ARCHIVE_MANIFEST_CACHE_SIZE = int(os.environ.get("ARCHIVE_MANIFEST_CACHE_SIZE", "256"))
+ARCHIVE_BATCH_CACHE_SIZE = int(os.environ.get("ARCHIVE_BATCH_CACHE_SIZE", "8"))
+ARCHIVE_MANIFEST_ATTEMPTS = 5
+
+_LEGACY_ORDER_ID = re.compile(r"order_[0-9a-f]{12}")
+
+_lock = threading.Lock()
+# (tenantId, manifest name) -> (loadedAt monotonic, manifest); missing
+# manifests are cached too, so repeated 404s do not reach S3.
+_manifests: "OrderedDict[tuple[str, str], tuple[float, dict]]" = OrderedDict()
+# batch key -> {orderId: order}; batches are immutable once written.
+_batches: "OrderedDict[str, dict]" = OrderedDict()
+
+
+class ManifestConflict(Exception):
+    pass
+
+
+def bucket() -> str:
+    return os.environ["MEDIA_BUCKET_NAME"]
+
+
+def manifest_name(order_id: str) -> str | None:
+    """The manifest listing `order_id`: its UTC day, LEGACY_MANIFEST, or None for ids never archived."""
+    created = sortable_id_time(order_id)
+    if created is not None:
+        return created.date().isoformat()
+    return LEGACY_MANIFEST if _LEGACY_ORDER_ID.fullmatch(order_id) else None
+
+
+def manifest_key(tenant_id: str, name: str) -> str:
+    return f"{ARCHIVE_PREFIX}/tenant={tenant_id}/manifests/{name}.json"
+
+
+def batch_key(tenant_id: str, date: str, batch_id: str) -> str:
+    return f"{ARCHIVE_PREFIX}/tenant={tenant_id}/date={date}/{batch_id}.jsonl.gz"
+
+
+def write_batch(tenant_id: str, date: str, orders: list[dict]) -> dict:
+    """Upload one batch file; returns its manifest entry."""
+    orders = sorted(orders, key=lambda order: order["orderId"])
+    body = gzip.compress("".join(json_dumps(order) + "\n" for order in orders).encode())
+    key = batch_key(tenant_id, date, new_sortable_id("batch"))
+    get_client("s3").put_object(
+        Bucket=bucket(),
+        Key=key,
+        Body=body,
+        ContentType="application/x-ndjson",
+        ContentEncoding="gzip",
+    )
+    return {
+        "key": key,
+        "date": date,
+        "count": len(orders),
+        "bytes": len(body),
+        "firstOrderId": orders[0]["orderId"],
+        "lastOrderId": orders[-1]["orderId"],
+        "archivedAt": now_iso(),
+    }
+
+
+def load_manifest(tenant_id: str, name: str) -> tuple[dict, str | None]:
+    """The manifest and its ETag (None when it does not exist yet)."""
+    try:
+        result = get_client("s3").get_object(Bucket=bucket(), Key=manifest_key(tenant_id, name))
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            raise
+        return {"tenantId": tenant_id, "name": name, "batches": []}, None
+    return json.loads(result["Body"].read()), result["ETag"]
+
+
+def save_manifest(tenant_id: str, name: str, manifest: dict, etag: str | None):
+    """
+    Write the manifest only if it is still the version read (`etag`, or absent
+    when None); raises ManifestConflict otherwise.
+    """
+    manifest["updatedAt"] = now_iso()
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        get_client("s3").put_object(
+            Bucket=bucket(),
+            Key=manifest_key(tenant_id, name),
+            Body=json_dumps(manifest).encode(),
+            ContentType="application/json",
+            **condition,
+        )
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] in ("PreconditionFailed", "ConditionalRequestConflict", "412"):
+            raise ManifestConflict(manifest_key(tenant_id, name)) from exc
+        raise
+    _remember(tenant_id, name, manifest)
+
+
+def add_to_manifest(tenant_id: str, name: str, entries: list[dict]):
+    """Append batch entries to a manifest, re-reading it if another writer got there first."""
+    for _ in range(ARCHIVE_MANIFEST_ATTEMPTS):
+        manifest, etag = load_manifest(tenant_id, name)
+        manifest["batches"].extend(entries)
+        manifest["batches"].sort(key=lambda batch: batch["firstOrderId"])
+        try:
+            save_manifest(tenant_id, name, manifest, etag)
+            return
+        except ManifestConflict:
+            continue
+    raise ManifestConflict(manifest_key(tenant_id, name))
+
+
+def find_archived_order(tenant_id: str, order_id: str) -> dict | None:
+    """
+    The archived copy of an order, or None. Only the manifest of the order's
+    day is read; this container keeps it for up to
+    ARCHIVE_MANIFEST_TTL_SECONDS, and the last ARCHIVE_BATCH_CACHE_SIZE
+    batches it read.
+    """
+    name = manifest_name(order_id)
+    if name is None:
+        return None
+    now = time.monotonic()
+    with _lock:
+        cached = _manifests.get((tenant_id, name))
+    if cached is None or now - cached[0] >= ARCHIVE_MANIFEST_TTL_SECONDS:
+        manifest = load_manifest(tenant_id, name)[0]
+        _remember(tenant_id, name, manifest, now)
+    else:
+        manifest = cached[1]
+
+    for batch in manifest["batches"]:
+        if batch["firstOrderId"] > order_id:
+            break
+        if order_id <= batch["lastOrderId"]:
+            order = _batch_orders(batch["key"]).get(order_id)
+            if order is not None:
+                return order
+    return None
+
+
+def _remember(tenant_id: str, name: str, manifest: dict, loaded_at: float | None = None):
+    with _lock:
+        _manifests[(tenant_id, name)] = (loaded_at or time.monotonic(), manifest)
+        _manifests.move_to_end((tenant_id, name))
+        while len(_manifests) > ARCHIVE_MANIFEST_CACHE_SIZE:
+            _manifests.popitem(last=False)
+
+
+def _batch_orders(key: str) -> dict:
+    with _lock:
+        orders = _batches.get(key)
+        if orders is not None:
+            _batches.move_to_end(key)
+            return orders
+    body = get_client("s3").get_object(Bucket=bucket(), Key=key)["Body"].read()
+    orders = {}
+    for line in gzip.decompress(body).splitlines():
+        if line:
+            order = json.loads(line)
+            orders[order["orderId"]] = order
+    with _lock:
+        _batches[key] = orders
+        while len(_batches) > ARCHIVE_BATCH_CACHE_SIZE:
+            _batches.popitem(last=False)
+    return orders
@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+
+from src.common.utils import _b64url_decode, response
+
+AUTH_TOKEN_TTL_SECONDS = int(os.environ.get("AUTH_TOKEN_TTL_SECONDS", "43200"))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024"))
+
+# Roles a user or screen can have: stage roles work one workflow stage, the
+# others follow every order. register_user and $connect reject anything else.
+STAGE_ROLES = ("kitchen", "packaging", "delivery")
+OBSERVER_ROLES = ("admin", "staff", "customer", "guest")
+ROLES = STAGE_ROLES + OBSERVER_ROLES
+
+# (secret, token) -> (expiresAt, claims) for tokens this container already verified.
+_verified: "OrderedDict[tuple[str, str], tuple[float, dict]]" = OrderedDict()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def auth_secret() -> str:
+    return os.environ.get("AUTH_SECRET", "dev-secret")
+
+
+def verify_token(token: str, secret: str | None = None) -> dict:
+    """
+    Check the signature and expiry of a token issued by `sign_token` and return
+    its claims. Verified tokens are kept in a bounded per-container LRU so a
+    screen polling with the same token only pays the HMAC/base64 work once.
+    """
+    secret = secret or auth_secret()
+    now = time.time()
+    key = (secret, token)
+    cached = _verified.get(key)
+    if cached is not None:
+        if cached[0] > now:
+            _verified.move_to_end(key)
+            return dict(cached[1])
+        _verified.pop(key, None)
+        raise InvalidToken("token expired")
+
+    try:
+        header_b64, body_b64, sig_b64 = token.split(".")
+        expected = hmac.new(
+            secret.encode(), f"{header_b64}.{body_b64}".encode(), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(sig_b64)):
+            raise InvalidToken("bad signature")
+        header = json.loads(_b64url_decode(header_b64))
+        claims = json.loads(_b64url_decode(body_b64))
+    except (ValueError, TypeError) as exc:
+        raise InvalidToken("malformed token") from exc
+    if header.get("alg") != "HS256" or not isinstance(claims, dict):
+        raise InvalidToken("malformed token")
+
+    expires_at = claims.get("exp") or (claims.get("iat") or 0) + AUTH_TOKEN_TTL_SECONDS
+    if expires_at <= now:
+        raise InvalidToken("token expired")
+
+    _verified[key] = (expires_at, claims)
+    if len(_verified) > AUTH_TOKEN_CACHE_SIZE:
+        _verified.popitem(last=False)
+    # Callers get their own copy; the cached claims must stay as verified.
+    return dict(claims)
+
+
+def authenticated(handler):
+    """
+    Handler decorator: verifies `Authorization: Bearer <token>` and injects the
+    claims as `event["auth"]`. Tokens for another tenant than the path's are
+    rejected, and so are requests whose x-tenant-id header disagrees with the
+    path. Requests without a token pass through unless AUTH_REQUIRED=true.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        headers = {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+        path_tenant_id = (event.get("pathParameters") or {}).get("tenantId")
+        header_tenant_id = headers.get("x-tenant-id")
+        if path_tenant_id and header_tenant_id and header_tenant_id != path_tenant_id:
+            return response(403, {"message": "x-tenant-id no coincide con el tenant de la ruta"})
+
+        authorization = headers.get("authorization") or ""
+        if not authorization:
+            if os.environ.get("AUTH_REQUIRED", "false").lower() == "true":
+                return response(401, {"message": "Authorization requerido"})
+            return handler(event, context)
+
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return response(401, {"message": "Token inválido"})
+        try:
+            claims = verify_token(token.strip())
+        except InvalidToken:
+            return response(401, {"message": "Token inválido"})
+
+        tenant_id = path_tenant_id or header_tenant_id
+        if tenant_id and claims.get("tenantId") != tenant_id:
+            return response(403, {"message": "Token de otro tenant"})
+
+        event["auth"] = claims
+        return handler(event, context)
+
+    return wrapper
@@ -0,0 +1,100 @@
+import os
+import time
+from collections import OrderedDict
+
+from src.common.utils import batch_get_items, bump_tenant_counter, get_table, read_tenant_counter
+
+# Per-container cache of catalog data (name/price/stockShards) keyed by (tenantId, productId).
+# Stock is never served from here: the transactional decrement in
+# src.common.inventory remains the only authority on availability.
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get("CATALOG_CACHE_TTL_SECONDS", "30"))
+CATALOG_CACHE_MAX_ITEMS = int(os.environ.get("CATALOG_CACHE_MAX_ITEMS", "2048"))
+
+_cache: "OrderedDict[tuple[str, str], tuple[float, dict]]" = OrderedDict()
+
+
+def get_products(tenant_id: str, product_ids: list[str]) -> dict[str, dict]:
+    """
+    Return `{productId: {productId, name, price, stockShards?}}` for the requested products,
+    serving warm entries from the cache and fetching the rest in one batch.
+    Unknown products are simply absent from the result.
+    """
+    now = time.monotonic()
+    products = {}
+    missing = []
+    for product_id in dict.fromkeys(product_ids):
+        entry = _cache.get((tenant_id, product_id))
+        if entry and entry[0] > now:
+            _cache.move_to_end((tenant_id, product_id))
+            products[product_id] = entry[1]
+        else:
+            missing.append(product_id)
+
+    if missing:
+        fetched = batch_get_items(
+            get_table("PRODUCTS_TABLE"),
+            [{"tenantId": tenant_id, "productId": product_id} for product_id in missing],
+            projection="productId, #name, price, stockShards",
+            names={"#name": "name"},
+        )
+        expires = now + CATALOG_CACHE_TTL_SECONDS
+        for prod in fetched:
+            products[prod["productId"]] = prod
+            _store((tenant_id, prod["productId"]), expires, prod)
+
+    return products
+
+
+def invalidate(tenant_id: str, product_id: str | None = None):
+    if product_id is not None:
+        _cache.pop((tenant_id, product_id), None)
+        return
+    for key in [k for k in _cache if k[0] == tenant_id]:
+        del _cache[key]
+
+
+def _store(key, expires: float, prod: dict):
+    _cache[key] = (expires, prod)
+    _cache.move_to_end(key)
+    while len(_cache) > CATALOG_CACHE_MAX_ITEMS:
+        _cache.popitem(last=False)
+
+
+# Versioned menu pages for list_products. `catalogVersion` on the tenant is
+# bumped by create_product; each container caches the version for
+# CATALOG_VERSION_TTL_SECONDS and the serialized pages of that version, so a
+# POS poll is answered without reading the products table.
+CATALOG_VERSION_TTL_SECONDS = float(os.environ.get("CATALOG_VERSION_TTL_SECONDS", "5"))
+CATALOG_PAGE_CACHE_MAX_ITEMS = int(os.environ.get("CATALOG_PAGE_CACHE_MAX_ITEMS", "256"))
+
+_versions: dict[str, tuple[float, int | None]] = {}
+_pages: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def catalog_version(tenant_id: str) -> int | None:
+    now = time.monotonic()
+    entry = _versions.get(tenant_id)
+    if entry and entry[0] > now:
+        return entry[1]
+    version = read_tenant_counter(tenant_id, "catalogVersion")
+    _versions[tenant_id] = (now + CATALOG_VERSION_TTL_SECONDS, version)
+    return version
+
+
+def bump_catalog_version(tenant_id: str):
+    bump_tenant_counter(tenant_id, "catalogVersion")
+    _versions.pop(tenant_id, None)
+
+
+def get_page(key: tuple) -> str | None:
+    body = _pages.get(key)
+    if body is not None:
+        _pages.move_to_end(key)
+    return body
+
+
+def store_page(key: tuple, body: str):
+    _pages[key] = body
+    _pages.move_to_end(key)
+    while len(_pages) > CATALOG_PAGE_CACHE_MAX_ITEMS:
+        _pages.popitem(last=False)
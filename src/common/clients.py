@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+from src.common.metrics import install_hooks
+
+# Lazy AWS client registry. boto3 itself is only imported when the first
+# client is needed, every client/resource is built once per container from a
+# single shared session, and build times are kept for cold_start_report().
+# Each client gets the metrics hook (src/common/metrics.py) when it is built.
+# With KFC_BACKEND=memory every client comes from the in-process backend
+# (src/common/memory_backend.py) instead.
+_lock = threading.RLock()
+_session = None
+_registry: dict = {}
+_timings: dict[str, float] = {}
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                started = time.perf_counter()
+                import boto3
+
+                _session = boto3.session.Session()
+                _timings["session"] = time.perf_counter() - started
+    return _session
+
+
+def get_client(service: str, endpoint_url: str | None = None, config=None):
+    """
+    Shared low-level client for `service` (one per endpoint). `config` only
+    applies when the client is first built.
+    """
+    if _memory_mode():
+        return _memory_backend().client(service)
+    key = ("client", service, endpoint_url)
+    client = _registry.get(key)
+    if client is None:
+        with _lock:
+            client = _registry.get(key)
+            if client is None:
+                session = get_session()
+                started = time.perf_counter()
+                client = session.client(service, endpoint_url=endpoint_url, config=config)
+                install_hooks(client, service)
+                _timings[_label(key)] = time.perf_counter() - started
+                _registry[key] = client
+    return client
+
+
+def get_resource(service: str):
+    if _memory_mode():
+        return _memory_backend().resource(service)
+    key = ("resource", service, None)
+    resource = _registry.get(key)
+    if resource is None:
+        with _lock:
+            resource = _registry.get(key)
+            if resource is None:
+                session = get_session()
+                started = time.perf_counter()
+                resource = session.resource(service)
+                install_hooks(resource.meta.client, service)
+                _timings[_label(key)] = time.perf_counter() - started
+                _registry[key] = resource
+    return resource
+
+
+def cold_start_report() -> dict:
+    """Milliseconds spent building the session and each client in this container."""
+    clients = {label: round(seconds * 1000, 2) for label, seconds in _timings.items()}
+    return {"clients": clients, "totalMs": round(sum(clients.values()), 2)}
+
+
+def _memory_mode() -> bool:
+    return os.environ.get("KFC_BACKEND", "aws").lower() == "memory"
+
+
+def _memory_backend():
+    from src.common.memory_backend import get_backend
+
+    return get_backend()
+
+
+def _label(key) -> str:
+    kind, service, endpoint_url = key
+    return f"{kind}:{service}" + (f"@{endpoint_url}" if endpoint_url else "")
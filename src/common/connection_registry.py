@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from boto3.dynamodb.conditions import Key
+
+from src.common.utils import bump_tenant_counter, query_all, read_tenant_counter
+
+# Per-container cache of each tenant's WebSocket connections for the router.
+# Within CONNECTION_CACHE_TTL_SECONDS the cached list is used as is; after that
+# the tenant's `connectionsVersion` (bumped by $connect/$disconnect) is read
+# and the connections are only re-queried when it changed, or when the entry
+# is older than CONNECTION_CACHE_MAX_AGE_SECONDS.
+CONNECTION_CACHE_TTL_SECONDS = float(os.environ.get("CONNECTION_CACHE_TTL_SECONDS", "2"))
+CONNECTION_CACHE_MAX_AGE_SECONDS = float(os.environ.get("CONNECTION_CACHE_MAX_AGE_SECONDS", "60"))
+CONNECTION_CACHE_MAX_TENANTS = int(os.environ.get("CONNECTION_CACHE_MAX_TENANTS", "512"))
+
+_lock = threading.Lock()
+# tenantId -> {"checked": monotonic, "loaded": monotonic, "version": int | None, "connections": [...]}
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def get_connections(table, tenant_id: str) -> list[dict]:
+    """`{connectionId, role, format}` for every connection of the tenant."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(tenant_id)
+    if entry and now - entry["checked"] < CONNECTION_CACHE_TTL_SECONDS:
+        return entry["connections"]
+
+    # Read the version before the connections: a change racing with the query
+    # leaves a stale version behind and forces a reload next time.
+    version = connections_version(tenant_id)
+    if (
+        entry
+        and version is not None
+        and version == entry["version"]
+        and now - entry["loaded"] < CONNECTION_CACHE_MAX_AGE_SECONDS
+    ):
+        entry["checked"] = now
+        return entry["connections"]
+
+    connections = list(
+        query_all(
+            table,
+            KeyConditionExpression=Key("tenantId").eq(tenant_id),
+            ProjectionExpression="connectionId, #role, #format",
+            ExpressionAttributeNames={"#role": "role", "#format": "format"},
+        )
+    )
+    with _lock:
+        _cache[tenant_id] = {"checked": now, "loaded": now, "version": version, "connections": connections}
+        _cache.move_to_end(tenant_id)
+        while len(_cache) > CONNECTION_CACHE_MAX_TENANTS:
+            _cache.popitem(last=False)
+    return connections
+
+
+def forget(tenant_id: str, connection_ids: list[str]):
+    """Drop connections found gone (ConnectionGone) from the cached list."""
+    gone = set(connection_ids)
+    with _lock:
+        entry = _cache.get(tenant_id)
+        if entry:
+            entry["connections"] = [c for c in entry["connections"] if c["connectionId"] not in gone]
+
+
+def invalidate(tenant_id: str | None = None):
+    with _lock:
+        if tenant_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(tenant_id, None)
+
+
+def connections_version(tenant_id: str) -> int | None:
+    return read_tenant_counter(tenant_id, "connectionsVersion")
+
+
+def bump_version(tenant_id: str):
+    """Signal a membership change; called by $connect and $disconnect."""
+    bump_tenant_counter(tenant_id, "connectionsVersion")
@@ -0,0 +1,81 @@
+"""
+JSON encoding for DynamoDB-typed data.
+
+Items read through boto3 carry Decimal numbers and Python sets; this module
+serializes them in a single pass (no intermediate converted copy). orjson is
+used when it is importable, otherwise the stdlib encoder with the same output.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment package
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        # Integral numbers stay integers (stock, quantity); the rest are floats.
+        number = float(o)
+        return number if number % 1 else int(number)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+_stdlib_encoder = json.JSONEncoder(default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+if orjson is not None:
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=_default).decode()
+
+else:
+
+    def dumps(obj) -> str:
+        return _stdlib_encoder.encode(obj)
+
+
+_PASSTHROUGH = (str, int, bool, type(None), Decimal)
+
+
+def to_dynamo(value):
+    """
+    Return `value` with floats converted to Decimal for boto3 writes. Scalars
+    are not re-visited and float-free containers are returned as-is, so the
+    common case (ids, strings, ints) costs one type check per leaf.
+    Subclasses (OrderedDict, IntEnum, ...) are handled like their base type.
+    """
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        converted = None
+        for key, item in value.items():
+            if isinstance(item, _PASSTHROUGH):
+                continue
+            new_item = to_dynamo(item)
+            if new_item is not item:
+                if converted is None:
+                    converted = dict(value)
+                converted[key] = new_item
+        return value if converted is None else converted
+    if isinstance(value, list):
+        converted = None
+        for index, item in enumerate(value):
+            if isinstance(item, _PASSTHROUGH):
+                continue
+            new_item = to_dynamo(item)
+            if new_item is not item:
+                if converted is None:
+                    converted = list(value)
+                converted[index] = new_item
+        return value if converted is None else converted
+    return value
@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from botocore.exceptions import ClientError
+
+from src.common.archive import ARCHIVE_AFTER_DAYS
+from src.common.clients import get_client
+from src.common.utils import get_table, json_dumps, now_iso, order_window_query, query_all
+
+# Order exports: the orders of a time range are read page by page and streamed
+# through gzip into an S3 multipart upload, so memory stays at about one part
+# (EXPORT_PART_SIZE_BYTES) whatever the size of the tenant. Each export has a
+# status object next to its file:
+#   exports/tenant=<tenantId>/<exportId>.json
+#   exports/tenant=<tenantId>/<exportId>.<ndjson|csv>.gz
+EXPORT_PREFIX = "exports"
+EXPORT_FORMATS = ("ndjson", "csv")
+# S3 parts must be at least 5 MiB, except the last one.
+EXPORT_PART_SIZE_BYTES = max(5 * 1024 * 1024, int(os.environ.get("EXPORT_PART_SIZE_BYTES", str(8 * 1024 * 1024))))
+EXPORT_URL_TTL_SECONDS = int(os.environ.get("EXPORT_URL_TTL_SECONDS", "3600"))
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+# exportWorker's Lambda timeout: a "running" export still unfinished by then
+# died with its invocation.
+EXPORT_WORKER_TIMEOUT_SECONDS = int(os.environ.get("EXPORT_WORKER_TIMEOUT_SECONDS", "900"))
+CSV_COLUMNS = (
+    "orderId",
+    "status",
+    "createdAt",
+    "updatedAt",
+    "deliveredAt",
+    "customerName",
+    "items",
+    "totalAmount",
+    "notes",
+)
+
+
+def bucket() -> str:
+    return os.environ["MEDIA_BUCKET_NAME"]
+
+
+def status_key(tenant_id: str, export_id: str) -> str:
+    return f"{EXPORT_PREFIX}/tenant={tenant_id}/{export_id}.json"
+
+
+def export_key(tenant_id: str, export_id: str, export_format: str) -> str:
+    return f"{EXPORT_PREFIX}/tenant={tenant_id}/{export_id}.{export_format}.gz"
+
+
+def load_status(tenant_id: str, export_id: str) -> dict | None:
+    try:
+        result = get_client("s3").get_object(Bucket=bucket(), Key=status_key(tenant_id, export_id))
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            raise
+        return None
+    return json.loads(result["Body"].read())
+
+
+def save_status(status: dict):
+    status["updatedAt"] = now_iso()
+    get_client("s3").put_object(
+        Bucket=bucket(),
+        Key=status_key(status["tenantId"], status["exportId"]),
+        Body=json_dumps(status).encode(),
+        ContentType="application/json",
+    )
+
+
+def current_status(status: dict) -> dict:
+    """The status as clients see it: a "running" export past its deadline timed out."""
+    if status.get("status") == "running" and status.get("deadline", "") < now_iso():
+        return {**status, "status": "failed", "error": "timed out"}
+    return status
+
+
+def archive_horizon() -> datetime:
+    """Orders created before this may already be archived, and exports only read the table."""
+    return datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def download_url(key: str) -> str:
+    return get_client("s3").generate_presigned_url(
+        "get_object",
+        Params={
+            "Bucket": bucket(),
+            "Key": key,
+            "ResponseContentDisposition": f'attachment; filename="{key.rsplit("/", 1)[-1]}"',
+        },
+        ExpiresIn=EXPORT_URL_TTL_SECONDS,
+    )
+
+
+def iter_orders(tenant_id: str, start: datetime, end: datetime):
+    """
+    Orders created in [start, end), filtered on createdAt. In order id order,
+    which is creation order except for legacy ids (see order_window_query).
+    """
+    yield from query_all(
+        get_table("ORDERS_TABLE"),
+        **order_window_query(tenant_id, start, end - timedelta(microseconds=1)),
+        Limit=EXPORT_PAGE_SIZE,
+    )
+
+
+def csv_row(order: dict) -> list:
+    delivery = (order.get("workflow") or {}).get("delivery") or {}
+    return [
+        order.get("orderId"),
+        order.get("status"),
+        order.get("createdAt"),
+        order.get("updatedAt"),
+        delivery.get("completedAt") or "",
+        (order.get("customer") or {}).get("name") or "",
+        sum(int(item.get("quantity") or 0) for item in order.get("items") or []),
+        order.get("totalAmount", ""),
+        order.get("notes") or "",
+    ]
+
+
+def export_orders(tenant_id: str, export_id: str, export_format: str, start: datetime, end: datetime) -> dict:
+    """Stream the range to S3; returns `{key, count, bytes, parts}`."""
+    key = export_key(tenant_id, export_id, export_format)
+    count = 0
+    with MultipartGzipUpload(key, "text/csv" if export_format == "csv" else "application/x-ndjson") as upload:
+        if export_format == "csv":
+            line = io.StringIO()
+            writer = csv.writer(line)
+            writer.writerow(CSV_COLUMNS)
+            for order in iter_orders(tenant_id, start, end):
+                writer.writerow(csv_row(order))
+                count += 1
+                if line.tell() >= 64 * 1024:
+                    upload.write(line.getvalue().encode())
+                    line.seek(0)
+                    line.truncate()
+            upload.write(line.getvalue().encode())
+        else:
+            for order in iter_orders(tenant_id, start, end):
+                upload.write(json_dumps(order).encode() + b"\n")
+                count += 1
+    return {"key": key, "count": count, "bytes": upload.size, "parts": len(upload.parts)}
+
+
+class MultipartGzipUpload:
+    """
+    Gzip-compresses what is written to it into an S3 multipart upload, one
+    EXPORT_PART_SIZE_BYTES part at a time. The upload is aborted if the
+    block raises.
+    """
+
+    def __init__(self, key: str, content_type: str):
+        self.key = key
+        self.content_type = content_type
+        self.parts: list[dict] = []
+        self.size = 0
+        self._buffer = bytearray()
+        # wbits 16+: gzip container instead of raw zlib.
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._upload_id = None
+
+    def __enter__(self):
+        self._upload_id = get_client("s3").create_multipart_upload(
+            Bucket=bucket(), Key=self.key, ContentType=self.content_type, ContentEncoding="gzip"
+        )["UploadId"]
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        s3 = get_client("s3")
+        if exc_type is not None:
+            s3.abort_multipart_upload(Bucket=bucket(), Key=self.key, UploadId=self._upload_id)
+            return False
+        self._buffer += self._compressor.flush()
+        self._upload_part()
+        s3.complete_multipart_upload(
+            Bucket=bucket(), Key=self.key, UploadId=self._upload_id, MultipartUpload={"Parts": self.parts}
+        )
+        return False
+
+    def write(self, data: bytes):
+        self._buffer += self._compressor.compress(data)
+        if len(self._buffer) >= EXPORT_PART_SIZE_BYTES:
+            self._upload_part()
+
+    def _upload_part(self):
+        part_number = len(self.parts) + 1
+        result = get_client("s3").upload_part(
+            Bucket=bucket(), Key=self.key, UploadId=self._upload_id, PartNumber=part_number, Body=bytes(self._buffer)
+        )
+        self.parts.append({"ETag": result["ETag"], "PartNumber": part_number})
+        self.size += len(self._buffer)
+        self._buffer.clear()
@@ -0,0 +1,344 @@
+"""
+Evaluator for the DynamoDB expression language (condition, key condition,
+update and projection expressions), used by the in-memory backend.
+"""
+
+import re
+from decimal import Decimal
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<op><>|<=|>=|=|<|>)"
+    r"|(?P<punct>[(),.\[\]+\-])"
+    r"|(?P<name>#[A-Za-z0-9_]+)"
+    r"|(?P<value>:[A-Za-z0-9_]+)"
+    r"|(?P<number>\d+)"
+    r"|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)"
+    r")"
+)
+_KEYWORDS = {"AND", "OR", "NOT", "BETWEEN", "IN", "SET", "REMOVE", "ADD", "DELETE"}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ExpressionError(f"Invalid expression near: {text[pos:pos + 20]!r}")
+        kind = match.lastgroup
+        token = match.group(kind)
+        if kind == "ident" and token.upper() in _KEYWORDS:
+            kind, token = "kw", token.upper()
+        tokens.append((kind, token))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str, names: dict | None, values: dict | None):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    # -- token helpers -----------------------------------------------------
+    def peek(self, offset: int = 0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, token=None):
+        current = self.peek()
+        if (kind and current[0] != kind) or (token and current[1] != token):
+            raise ExpressionError(f"Expected {token or kind}, got {current[1]!r}")
+        self.pos += 1
+        return current
+
+    def accept(self, kind, token=None) -> bool:
+        current = self.peek()
+        if current[0] == kind and (token is None or current[1] == token):
+            self.pos += 1
+            return True
+        return False
+
+    def done(self) -> bool:
+        return self.pos >= len(self.tokens)
+
+    # -- operands ----------------------------------------------------------
+    def path(self) -> tuple:
+        parts = [self._path_segment()]
+        while True:
+            if self.accept("punct", "."):
+                parts.append(self._path_segment())
+            elif self.accept("punct", "["):
+                parts.append(int(self.take("number")[1]))
+                self.take("punct", "]")
+            else:
+                return ("path", tuple(parts))
+
+    def _path_segment(self) -> str:
+        kind, token = self.take()
+        if kind == "name":
+            if token not in self.names:
+                raise ExpressionError(f"Unknown attribute name placeholder {token}")
+            return self.names[token]
+        if kind == "ident":
+            return token
+        raise ExpressionError(f"Invalid attribute path segment {token!r}")
+
+    def operand(self):
+        kind, token = self.peek()
+        if kind == "value":
+            self.pos += 1
+            if token not in self.values:
+                raise ExpressionError(f"Unknown value placeholder {token}")
+            return ("value", self.values[token])
+        if kind == "ident" and self.peek(1) == ("punct", "("):
+            self.pos += 2
+            args = [self.operand()]
+            while self.accept("punct", ","):
+                args.append(self.operand())
+            self.take("punct", ")")
+            return ("call", token, args)
+        return self.path()
+
+    # -- conditions --------------------------------------------------------
+    def condition(self):
+        node = self._and()
+        while self.accept("kw", "OR"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self.accept("kw", "AND"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self.accept("kw", "NOT"):
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        if self.peek() == ("punct", "("):
+            self.pos += 1
+            node = self.condition()
+            self.take("punct", ")")
+            return node
+        left = self.operand()
+        if left[0] == "call" and left[1] in _BOOLEAN_FUNCTIONS:
+            return left
+        kind, token = self.peek()
+        if kind == "op":
+            self.pos += 1
+            return ("cmp", token, left, self.operand())
+        if self.accept("kw", "BETWEEN"):
+            low = self.operand()
+            self.take("kw", "AND")
+            return ("between", left, low, self.operand())
+        if self.accept("kw", "IN"):
+            self.take("punct", "(")
+            options = [self.operand()]
+            while self.accept("punct", ","):
+                options.append(self.operand())
+            self.take("punct", ")")
+            return ("in", left, options)
+        raise ExpressionError(f"Unexpected token {token!r}")
+
+    # -- updates -----------------------------------------------------------
+    def update(self) -> list:
+        actions = []
+        while not self.done():
+            clause = self.take("kw")[1]
+            while True:
+                if clause == "SET":
+                    target = self.path()
+                    self.take("op", "=")
+                    value = self.operand()
+                    if self.peek() in (("punct", "+"), ("punct", "-")):
+                        sign = self.take()[1]
+                        value = ("arith", sign, value, self.operand())
+                    actions.append(("SET", target, value))
+                elif clause == "REMOVE":
+                    actions.append(("REMOVE", self.path(), None))
+                elif clause in ("ADD", "DELETE"):
+                    actions.append((clause, self.path(), self.operand()))
+                else:
+                    raise ExpressionError(f"Unknown update clause {clause}")
+                if not self.accept("punct", ","):
+                    break
+        return actions
+
+    def projection(self) -> list:
+        paths = [self.path()]
+        while self.accept("punct", ","):
+            paths.append(self.path())
+        return paths
+
+
+_BOOLEAN_FUNCTIONS = {"attribute_exists", "attribute_not_exists", "begins_with", "contains", "attribute_type"}
+_MISSING = object()
+
+
+def _get(item, parts):
+    current = item
+    for part in parts:
+        if isinstance(part, int):
+            if not isinstance(current, list) or part >= len(current):
+                return _MISSING
+            current = current[part]
+        else:
+            if not isinstance(current, dict) or part not in current:
+                return _MISSING
+            current = current[part]
+    return current
+
+
+def _resolve(node, item):
+    kind = node[0]
+    if kind == "value":
+        return node[1]
+    if kind == "path":
+        return _get(item, node[1])
+    if kind == "call":
+        name, args = node[1], node[2]
+        if name == "size":
+            value = _resolve(args[0], item)
+            return _MISSING if value is _MISSING else Decimal(len(value))
+        if name == "if_not_exists":
+            value = _resolve(args[0], item)
+            return _resolve(args[1], item) if value is _MISSING else value
+        if name == "list_append":
+            return list(_resolve(args[0], item)) + list(_resolve(args[1], item))
+        raise ExpressionError(f"Unsupported function {name}")
+    if kind == "arith":
+        left, right = _resolve(node[2], item), _resolve(node[3], item)
+        if left is _MISSING or right is _MISSING:
+            raise ExpressionError("An operand in the update expression does not exist")
+        return left + right if node[1] == "+" else left - right
+    raise ExpressionError(f"Unsupported operand {kind}")
+
+
+def _compare(op, left, right) -> bool:
+    if left is _MISSING or right is _MISSING:
+        return op == "<>" and not (left is _MISSING and right is _MISSING)
+    if op == "=":
+        return left == right
+    if op == "<>":
+        return left != right
+    if type(left) is not type(right) and not (
+        isinstance(left, (int, Decimal)) and isinstance(right, (int, Decimal))
+    ):
+        return False
+    return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op]
+
+
+def _evaluate(node, item) -> bool:
+    kind = node[0]
+    if kind == "and":
+        return _evaluate(node[1], item) and _evaluate(node[2], item)
+    if kind == "or":
+        return _evaluate(node[1], item) or _evaluate(node[2], item)
+    if kind == "not":
+        return not _evaluate(node[1], item)
+    if kind == "cmp":
+        return _compare(node[1], _resolve(node[2], item), _resolve(node[3], item))
+    if kind == "between":
+        value = _resolve(node[1], item)
+        return _compare(">=", value, _resolve(node[2], item)) and _compare(
+            "<=", value, _resolve(node[3], item)
+        )
+    if kind == "in":
+        value = _resolve(node[1], item)
+        return any(_compare("=", value, _resolve(option, item)) for option in node[2])
+    if kind == "call":
+        name, args = node[1], node[2]
+        value = _resolve(args[0], item)
+        if name == "attribute_exists":
+            return value is not _MISSING
+        if name == "attribute_not_exists":
+            return value is _MISSING
+        if name == "begins_with":
+            prefix = _resolve(args[1], item)
+            return isinstance(value, str) and value.startswith(prefix)
+        if name == "contains":
+            needle = _resolve(args[1], item)
+            return value is not _MISSING and needle in value
+    raise ExpressionError(f"Unsupported condition {kind}")
+
+
+def parse_condition(text, names=None, values=None):
+    parser = _Parser(text, names, values)
+    node = parser.condition()
+    if not parser.done():
+        raise ExpressionError(f"Trailing tokens in condition {text!r}")
+    return node
+
+
+def evaluate_condition(text, item, names=None, values=None) -> bool:
+    return _evaluate(parse_condition(text, names, values), item)
+
+
+def key_equalities(node) -> dict:
+    """Attribute -> value for every `attr = :v` joined by AND in a key condition."""
+    if node[0] == "and":
+        return {**key_equalities(node[1]), **key_equalities(node[2])}
+    if node[0] == "cmp" and node[1] == "=" and node[2][0] == "path" and node[3][0] == "value":
+        return {node[2][1][0]: node[3][1]}
+    return {}
+
+
+def matches(node, item) -> bool:
+    return _evaluate(node, item)
+
+
+def apply_update(text, item: dict, names=None, values=None) -> dict:
+    """Apply an UpdateExpression to `item` in place and return it."""
+    for action, target, operand in _Parser(text, names, values).update():
+        parts = target[1]
+        parent = _get(item, parts[:-1]) if len(parts) > 1 else item
+        if parent is _MISSING or not isinstance(parent, (dict, list)):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        leaf = parts[-1]
+        if action == "SET":
+            value = _resolve(operand, item)
+            if isinstance(parent, list) and leaf >= len(parent):
+                parent.append(value)
+            else:
+                parent[leaf] = value
+        elif action == "REMOVE":
+            if isinstance(parent, dict):
+                parent.pop(leaf, None)
+            elif leaf < len(parent):
+                del parent[leaf]
+        elif action == "ADD":
+            increment = _resolve(operand, item)
+            current = _get(item, parts)
+            if isinstance(increment, set):
+                parent[leaf] = (current if current is not _MISSING else set()) | increment
+            else:
+                parent[leaf] = (current if current is not _MISSING else 0) + increment
+        elif action == "DELETE":
+            current = _get(item, parts)
+            if current is not _MISSING:
+                parent[leaf] = current - _resolve(operand, item)
+    return item
+
+
+def project(text, item: dict, names=None) -> dict:
+    projected: dict = {}
+    for _kind, parts in _Parser(text, names, None).projection():
+        value = _get(item, parts)
+        if value is _MISSING:
+            continue
+        target = projected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return projected
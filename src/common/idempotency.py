@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import time
+
+from src.common.utils import get_table, response
+
+# Idempotency-Key support for POST endpoints. The record is written in the
+# same DynamoDB transaction as the side effects it guards, so a key is either
+# claimed together with the order or not at all, and a retry only costs one
+# read to replay the stored response. Side effects outside the transaction
+# (events) are tracked with a `published` flag, so a replay can finish them.
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+MAX_KEY_LENGTH = 255
+
+
+def get_idempotency_key(event: dict) -> str | None:
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    key = (headers.get("idempotency-key") or "").strip()
+    return key or None
+
+
+def request_hash(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def lookup(tenant_id: str, key: str) -> dict | None:
+    """The live record for `key`, ignoring records past their TTL not yet swept."""
+    item = get_table("IDEMPOTENCY_TABLE").get_item(
+        Key={"tenantId": tenant_id, "idempotencyKey": key}, ConsistentRead=True
+    ).get("Item")
+    if item and int(item.get("expiresAt", 0)) > time.time():
+        return item
+    return None
+
+
+def replay(record: dict, fingerprint: str):
+    """The stored response, or 422 when the key was used for a different request."""
+    if record.get("requestHash") != fingerprint:
+        return response(422, {"message": "Idempotency-Key ya usada con otro cuerpo"})
+    return response(int(record["statusCode"]), record["body"], {"Idempotent-Replayed": "true"})
+
+
+def mark_published(tenant_id: str, key: str):
+    """Record that the events of the request behind `key` went out."""
+    get_table("IDEMPOTENCY_TABLE").update_item(
+        Key={"tenantId": tenant_id, "idempotencyKey": key},
+        UpdateExpression="SET published = :true",
+        ExpressionAttributeValues={":true": True},
+    )
+
+
+def record_write(tenant_id: str, key: str, fingerprint: str, status: int, body: str, **attributes) -> dict:
+    """TransactItems entry that claims `key` (or an expired claim) and stores the response."""
+    now = int(time.time())
+    return {
+        "Put": {
+            "TableName": os.environ["IDEMPOTENCY_TABLE"],
+            "Item": {
+                "tenantId": tenant_id,
+                "idempotencyKey": key,
+                "requestHash": fingerprint,
+                "statusCode": status,
+                "body": body,
+                "expiresAt": now + IDEMPOTENCY_TTL_SECONDS,
+                **attributes,
+            },
+            "ConditionExpression": "attribute_not_exists(idempotencyKey) OR expiresAt < :now",
+            "ExpressionAttributeValues": {":now": now},
+        }
+    }
@@ -0,0 +1,190 @@
+import random
+
+from botocore.exceptions import ClientError
+
+from src.common.utils import batch_get_items
+
+# Sharded inventory: a product created with `stockShards: N > 1` keeps its stock
+# in N counter items (`<productId>#shard#<i>`) in the products table, so
+# concurrent orders for the same SKU update different keys.
+SHARD_SEPARATOR = "#shard#"
+MAX_STOCK_SHARDS = 50
+RESERVE_ATTEMPTS = 3
+
+
+class StockUnavailable(Exception):
+    def __init__(self, product_id: str):
+        super().__init__(f"not enough stock for {product_id}")
+        self.product_id = product_id
+
+
+class StockConflict(Exception):
+    """The reservation kept losing transaction conflicts; the order can be retried."""
+
+
+class WriteRejected(Exception):
+    """One of the `extra_writes` passed to reserve_stock failed its condition."""
+
+    def __init__(self, write: dict):
+        super().__init__("conditional write rejected")
+        self.write = write
+
+
+def shard_id(product_id: str, index: int) -> str:
+    return f"{product_id}{SHARD_SEPARATOR}{index}"
+
+
+def is_shard(product_id: str) -> bool:
+    return SHARD_SEPARATOR in product_id
+
+
+def shard_count(product: dict) -> int:
+    return int(product.get("stockShards") or 1)
+
+
+def shard_items(tenant_id: str, product_id: str, stock: int, shards: int) -> list[dict]:
+    """Counter items splitting `stock` as evenly as possible across `shards`."""
+    base, extra = divmod(stock, shards)
+    return [
+        {
+            "tenantId": tenant_id,
+            "productId": shard_id(product_id, index),
+            "stock": base + (1 if index < extra else 0),
+        }
+        for index in range(shards)
+    ]
+
+
+def aggregate_shards(items: list[dict]) -> list[dict]:
+    """Fold shard counters into their product's `stock` and drop them from the list."""
+    totals: dict = {}
+    products = []
+    for item in items:
+        product_id = item["productId"]
+        if is_shard(product_id):
+            parent = product_id.split(SHARD_SEPARATOR, 1)[0]
+            totals[parent] = totals.get(parent, 0) + item.get("stock", 0)
+        else:
+            products.append(item)
+    for product in products:
+        if shard_count(product) > 1:
+            product["stock"] = totals.get(product["productId"], 0)
+    return products
+
+
+def attach_shard_stock(table, tenant_id: str, products: list[dict]) -> list[dict]:
+    """Set `stock` on sharded products to the sum of their shard counters."""
+    sharded = {p["productId"]: p for p in products if shard_count(p) > 1}
+    if not sharded:
+        return products
+    keys = [
+        {"tenantId": tenant_id, "productId": shard_id(product_id, index)}
+        for product_id, product in sharded.items()
+        for index in range(shard_count(product))
+    ]
+    for product in sharded.values():
+        product["stock"] = 0
+    for counter in batch_get_items(table, keys, projection="productId, stock"):
+        parent = counter["productId"].split(SHARD_SEPARATOR, 1)[0]
+        sharded[parent]["stock"] += counter.get("stock", 0)
+    return products
+
+
+def reserve_stock(table, tenant_id: str, quantities: dict, products: dict, extra_writes=()):
+    """
+    Atomically decrement stock for every `{productId: quantity}`; the
+    transaction conditions are the authoritative stock check. Sharded products
+    reserve from a random shard, moving to other shards when one runs dry or
+    conflicts, and finally spread the quantity over several shards.
+    `extra_writes` (TransactItems entries, e.g. the order itself) commit in the
+    same transaction. Raises StockUnavailable when there is not enough stock,
+    WriteRejected when an extra write fails its condition and StockConflict
+    when the transaction keeps being cancelled by concurrent writers.
+    """
+    order = {
+        product_id: random.sample(range(shard_count(products[product_id])), shard_count(products[product_id]))
+        for product_id in quantities
+        if shard_count(products[product_id]) > 1
+    }
+    for attempt in range(RESERVE_ATTEMPTS):
+        plan = [
+            (product_id, order[product_id][attempt % len(order[product_id])] if product_id in order else None, qty)
+            for product_id, qty in quantities.items()
+        ]
+        failed = _transact(table, tenant_id, plan, extra_writes)
+        if not failed:
+            return
+        for (product_id, shard, _qty), code in failed:
+            if shard is None and code == "ConditionalCheckFailed":
+                raise StockUnavailable(product_id)
+
+    plan = []
+    for product_id, qty in quantities.items():
+        if product_id in order:
+            plan.extend(_spread(table, tenant_id, product_id, len(order[product_id]), qty))
+        else:
+            plan.append((product_id, None, qty))
+    failed = _transact(table, tenant_id, plan, extra_writes)
+    for (product_id, _shard, _qty), code in failed:
+        if code == "ConditionalCheckFailed":
+            raise StockUnavailable(product_id)
+    if failed:
+        raise StockConflict()
+
+
+def _spread(table, tenant_id: str, product_id: str, shards: int, qty: int) -> list[tuple]:
+    counters = batch_get_items(
+        table,
+        [{"tenantId": tenant_id, "productId": shard_id(product_id, index)} for index in range(shards)],
+        projection="productId, stock",
+    )
+    plan = []
+    remaining = qty
+    for counter in sorted(counters, key=lambda c: c.get("stock", 0), reverse=True):
+        if remaining <= 0:
+            break
+        take = min(remaining, int(counter.get("stock", 0)))
+        if take > 0:
+            plan.append((product_id, int(counter["productId"].rsplit(SHARD_SEPARATOR, 1)[1]), take))
+            remaining -= take
+    if remaining > 0:
+        raise StockUnavailable(product_id)
+    return plan
+
+
+def _transact(table, tenant_id: str, plan: list[tuple], extra_writes) -> list[tuple]:
+    """Run the decrements; return `[(plan entry, reason code)]` for the items that failed."""
+    transact_items = [
+        {
+            "Update": {
+                "TableName": table.name,
+                "Key": {
+                    "tenantId": tenant_id,
+                    "productId": product_id if shard is None else shard_id(product_id, shard),
+                },
+                "UpdateExpression": "SET stock = stock - :q",
+                "ConditionExpression": "stock >= :q",
+                "ExpressionAttributeValues": {":q": qty},
+            }
+        }
+        for product_id, shard, qty in plan
+    ]
+    transact_items.extend(extra_writes)
+    try:
+        table.meta.client.transact_write_items(TransactItems=transact_items)
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        reasons = exc.response.get("CancellationReasons") or []
+        for write, reason in zip(extra_writes, reasons[len(plan):]):
+            if reason.get("Code") == "ConditionalCheckFailed":
+                raise WriteRejected(write) from exc
+        failed = [
+            (entry, reason.get("Code"))
+            for entry, reason in zip(plan, reasons)
+            if reason.get("Code") not in (None, "None")
+        ]
+        if not failed:
+            raise
+        return failed
+    return []
@@ -0,0 +1,14 @@
+import logging
+import os
+
+# Handlers log through the standard logging module: on Lambda the runtime
+# attaches its handler to the root logger, so records land in CloudWatch with
+# the request id. LOG_LEVEL applies to the "kfc" loggers only.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module, e.g. `get_logger(__name__)`."""
+    logger = logging.getLogger(f"kfc.{name.removeprefix('src.')}")
+    logger.setLevel(LOG_LEVEL)
+    return logger
@@ -0,0 +1,876 @@
+"""
+In-process stand-ins for the AWS services used by the handlers, selected with
+KFC_BACKEND=memory (see src/common/clients.py).
+
+DynamoDB tables (key conditions, GSIs, conditional/transactional writes),
+EventBridge rules (read from serverless.yml), SQS-triggered workers, the Step Functions task-token
+workflow, SNS, S3 objects and the WebSocket management API all live in one
+process.
+Deliveries are queued and run by `drain()`, so a caller drives the pipeline:
+
+    backend = get_backend()
+    create_order.handler(event, None)
+    backend.drain()   # router, workflow start, kitchen worker, ...
+"""
+
+import copy
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from decimal import Decimal
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+from src.common import expressions, metrics
+
+# Mirrors the table definitions in serverless.yml: env var -> (hash, range), GSIs.
+TABLE_SCHEMAS = {
+    "TENANTS_TABLE": {"key": ("tenantId", None), "indexes": {}},
+    "ORDERS_TABLE": {
+        "key": ("tenantId", "orderId"),
+        "indexes": {"status-index": ("tenantId", "status"), "updated-index": ("tenantId", "updatedAt")},
+    },
+    "CONNECTIONS_TABLE": {
+        "key": ("tenantId", "connectionId"),
+        "indexes": {
+            "tenant-role-index": ("tenantId", "role"),
+            "connection-index": ("connectionId", "tenantId"),
+        },
+    },
+    "USERS_TABLE": {
+        "key": ("tenantId", "userId"),
+        "indexes": {"tenant-email-index": ("tenantId", "email")},
+    },
+    "PRODUCTS_TABLE": {"key": ("tenantId", "productId"), "indexes": {}},
+    "IDEMPOTENCY_TABLE": {"key": ("tenantId", "idempotencyKey"), "indexes": {}},
+    "TENANT_STATS_TABLE": {"key": ("tenantId", "statsKey"), "indexes": {}},
+}
+
+# Lambda wiring from serverless.yml.
+ROUTER_HANDLER = "src.handlers.events.router.handler"
+STATS_HANDLER = "src.handlers.stats.updater.handler"
+NOTIFIER_HANDLER = "src.handlers.events.notifier.handler"
+NOTIFICATIONS_QUEUE = "notifications"
+WS_EVENTS_QUEUE = "ws-events"
+WORKFLOW_STAGES = ("kitchen", "packaging", "delivery")
+QUEUE_HANDLERS = {
+    "kitchen": "src.handlers.workflow.kitchen_worker.handler",
+    "packaging": "src.handlers.workflow.packaging_worker.handler",
+    "delivery": "src.handlers.workflow.delivery_worker.handler",
+}
+SQS_HANDLERS = {**QUEUE_HANDLERS, NOTIFICATIONS_QUEUE: NOTIFIER_HANDLER, WS_EVENTS_QUEUE: ROUTER_HANDLER}
+SQS_BATCH_SIZE = 10
+SQS_MAX_RECEIVES = 5
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+SERVERLESS_YML = Path(__file__).resolve().parents[2] / "serverless.yml"
+# AWS::Events::Rule targets in serverless.yml, by CloudFormation logical id.
+RULE_TARGETS = {
+    "WsEventsQueue": ("sqs", WS_EVENTS_QUEUE),
+    "NotificationsQueue": ("sqs", NOTIFICATIONS_QUEUE),
+    "OrderWorkflow": ("workflow", None),
+}
+
+LOCAL_ENV = {
+    "TENANTS_TABLE": "tenants",
+    "ORDERS_TABLE": "orders",
+    "CONNECTIONS_TABLE": "connections",
+    "USERS_TABLE": "users",
+    "PRODUCTS_TABLE": "products",
+    "IDEMPOTENCY_TABLE": "idempotency",
+    "TENANT_STATS_TABLE": "tenant-stats",
+    "MEDIA_BUCKET_NAME": "media",
+    "EVENT_BUS_NAME": "local-bus",
+    "NOTIFICATIONS_TOPIC_ARN": "arn:aws:sns:local:000000000000:notifications",
+    "ORDER_WORKFLOW_ARN": "arn:aws:states:local:000000000000:stateMachine:workflow",
+    "KITCHEN_QUEUE_URL": "local://kitchen",
+    "PACKAGING_QUEUE_URL": "local://packaging",
+    "DELIVERY_QUEUE_URL": "local://delivery",
+    "WEBSOCKET_API_ENDPOINT": "https://local.execute-api/ws",
+}
+
+
+def _error(code: str, message: str, operation: str, **extra) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}, **extra}, operation)
+
+
+def _to_storage(value):
+    # Match what boto3 gives back from DynamoDB: every number is a Decimal.
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {k: _to_storage(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_storage(v) for v in value]
+    if isinstance(value, set):
+        return {_to_storage(v) for v in value}
+    return value
+
+
+class MemoryTable:
+    def __init__(self, name: str, key: tuple, indexes: dict):
+        self.name = name
+        self.hash_key, self.range_key = key
+        self.indexes = indexes
+        self.partitions: dict = {}
+
+    def key_of(self, item: dict) -> tuple:
+        return (item.get(self.hash_key), item.get(self.range_key) if self.range_key else None)
+
+    def get(self, key: dict):
+        hash_value, range_value = self.key_of(_to_storage(key))
+        return self.partitions.get(hash_value, {}).get(range_value)
+
+    def put(self, item: dict):
+        hash_value, range_value = self.key_of(item)
+        self.partitions.setdefault(hash_value, {})[range_value] = item
+
+    def delete(self, key: dict):
+        hash_value, range_value = self.key_of(_to_storage(key))
+        partition = self.partitions.get(hash_value)
+        if partition is not None:
+            partition.pop(range_value, None)
+
+    def candidates(self, index_name: str | None, hash_value):
+        hash_key, _ = self.indexes[index_name] if index_name else (self.hash_key, None)
+        if hash_key == self.hash_key:
+            return list(self.partitions.get(hash_value, {}).values())
+        return [
+            item
+            for partition in self.partitions.values()
+            for item in partition.values()
+            if item.get(hash_key) == hash_value
+        ]
+
+
+class MemoryDynamoClient:
+    """The DynamoDB operations the handlers use, on native Python types."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def _table(self, name: str) -> MemoryTable:
+        return self._backend.table(name)
+
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, **_):
+        with self._backend.lock:
+            item = self._table(TableName).get(Key)
+            if item is None:
+                return {}
+            item = copy.deepcopy(item)
+        if ProjectionExpression:
+            item = expressions.project(ProjectionExpression, item, ExpressionAttributeNames)
+        return {"Item": item}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, **_):
+        with self._backend.lock:
+            table = self._table(TableName)
+            self._check(table, Item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, "PutItem")
+            table.put(_to_storage(copy.deepcopy(Item)))
+        return {}
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, **_):
+        with self._backend.lock:
+            table = self._table(TableName)
+            self._check(table, Key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, "DeleteItem")
+            table.delete(Key)
+        return {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues="NONE", **_):
+        values = _to_storage(ExpressionAttributeValues or {})
+        with self._backend.lock:
+            table = self._table(TableName)
+            old = self._check(table, Key, ConditionExpression, ExpressionAttributeNames, values, "UpdateItem")
+            new = copy.deepcopy(old) if old is not None else _to_storage(dict(Key))
+            try:
+                expressions.apply_update(UpdateExpression, new, ExpressionAttributeNames, values)
+            except expressions.ExpressionError as exc:
+                raise _error("ValidationException", str(exc), "UpdateItem") from exc
+            table.put(new)
+        if ReturnValues == "ALL_OLD":
+            return {"Attributes": copy.deepcopy(old)} if old is not None else {}
+        if ReturnValues in ("ALL_NEW", "UPDATED_NEW"):
+            return {"Attributes": copy.deepcopy(new)}
+        return {}
+
+    def query(self, TableName, KeyConditionExpression, IndexName=None, Limit=None, ScanIndexForward=True,
+              ExclusiveStartKey=None, FilterExpression=None, ProjectionExpression=None,
+              ExpressionAttributeNames=None, ExpressionAttributeValues=None, Select=None, **_):
+        values = _to_storage(ExpressionAttributeValues or {})
+        key_node = expressions.parse_condition(KeyConditionExpression, ExpressionAttributeNames, values)
+        filter_node = (
+            expressions.parse_condition(FilterExpression, ExpressionAttributeNames, values)
+            if FilterExpression
+            else None
+        )
+        with self._backend.lock:
+            table = self._table(TableName)
+            hash_key, range_key = table.indexes[IndexName] if IndexName else (table.hash_key, table.range_key)
+            equalities = expressions.key_equalities(key_node)
+            if hash_key not in equalities:
+                raise _error("ValidationException", "Query condition missed key schema element", "Query")
+            items = [
+                item
+                for item in table.candidates(IndexName, equalities[hash_key])
+                if (range_key is None or range_key in item) and expressions.matches(key_node, item)
+            ]
+
+            def order(item):
+                return (item.get(range_key, ""), table.key_of(item)[1] or "")
+
+            items.sort(key=order, reverse=not ScanIndexForward)
+            if ExclusiveStartKey:
+                start = _to_storage(ExclusiveStartKey)
+                position = (start.get(range_key, ""), start.get(table.range_key, "") if table.range_key else "")
+                items = [
+                    item
+                    for item in items
+                    if (order(item) > position if ScanIndexForward else order(item) < position)
+                ]
+            last_key = None
+            if Limit is not None and len(items) > Limit:
+                items = items[:Limit]
+                last = items[-1]
+                last_key = {table.hash_key: last[table.hash_key]}
+                if table.range_key:
+                    last_key[table.range_key] = last[table.range_key]
+                if IndexName:
+                    last_key.update({hash_key: last[hash_key], range_key: last[range_key]})
+            scanned = len(items)
+            if filter_node is not None:
+                items = [item for item in items if expressions.matches(filter_node, item)]
+            items = copy.deepcopy(items)
+        if ProjectionExpression:
+            items = [expressions.project(ProjectionExpression, item, ExpressionAttributeNames) for item in items]
+        result = {"Items": items, "Count": len(items), "ScannedCount": scanned}
+        if Select == "COUNT":
+            result.pop("Items")
+        if last_key:
+            result["LastEvaluatedKey"] = last_key
+        return result
+
+    def scan(self, TableName, Limit=None, ExclusiveStartKey=None, FilterExpression=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None, **_):
+        values = _to_storage(ExpressionAttributeValues or {})
+        filter_node = (
+            expressions.parse_condition(FilterExpression, ExpressionAttributeNames, values)
+            if FilterExpression
+            else None
+        )
+        with self._backend.lock:
+            table = self._table(TableName)
+            items = sorted(
+                (item for partition in table.partitions.values() for item in partition.values()),
+                key=lambda item: tuple(str(part) for part in table.key_of(item)),
+            )
+            if ExclusiveStartKey:
+                start = tuple(str(part) for part in table.key_of(_to_storage(ExclusiveStartKey)))
+                items = [item for item in items if tuple(str(part) for part in table.key_of(item)) > start]
+            last_key = None
+            if Limit is not None and len(items) > Limit:
+                items = items[:Limit]
+                last_key = {k: items[-1][k] for k in (table.hash_key, table.range_key) if k}
+            scanned = len(items)
+            if filter_node is not None:
+                items = [item for item in items if expressions.matches(filter_node, item)]
+            items = copy.deepcopy(items)
+        if ProjectionExpression:
+            items = [expressions.project(ProjectionExpression, item, ExpressionAttributeNames) for item in items]
+        result = {"Items": items, "Count": len(items), "ScannedCount": scanned}
+        if last_key:
+            result["LastEvaluatedKey"] = last_key
+        return result
+
+    def batch_get_item(self, RequestItems, **_):
+        responses = {}
+        for table_name, request in RequestItems.items():
+            found = []
+            for key in request["Keys"]:
+                item = self.get_item(
+                    table_name,
+                    key,
+                    ProjectionExpression=request.get("ProjectionExpression"),
+                    ExpressionAttributeNames=request.get("ExpressionAttributeNames"),
+                ).get("Item")
+                if item is not None:
+                    found.append(item)
+            responses[table_name] = found
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems, **_):
+        for table_name, requests in RequestItems.items():
+            for request in requests:
+                if "PutRequest" in request:
+                    self.put_item(table_name, request["PutRequest"]["Item"])
+                else:
+                    self.delete_item(table_name, request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+    def transact_write_items(self, TransactItems, **_):
+        with self._backend.lock:
+            reasons = []
+            for entry in TransactItems:
+                (action, spec), = entry.items()
+                table = self._table(spec["TableName"])
+                key = spec.get("Key") or {k: spec["Item"][k] for k in (table.hash_key, table.range_key) if k}
+                try:
+                    self._check(
+                        table,
+                        key,
+                        spec.get("ConditionExpression"),
+                        spec.get("ExpressionAttributeNames"),
+                        _to_storage(spec.get("ExpressionAttributeValues") or {}),
+                        "TransactWriteItems",
+                    )
+                    reasons.append({"Code": "None"})
+                except ClientError:
+                    reasons.append({"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"})
+            if any(reason["Code"] != "None" for reason in reasons):
+                codes = ", ".join(reason["Code"] for reason in reasons)
+                raise _error(
+                    "TransactionCanceledException",
+                    f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                    "TransactWriteItems",
+                    CancellationReasons=reasons,
+                )
+            for entry in TransactItems:
+                (action, spec), = entry.items()
+                if action == "Put":
+                    self.put_item(spec["TableName"], spec["Item"])
+                elif action == "Update":
+                    self.update_item(
+                        spec["TableName"],
+                        spec["Key"],
+                        spec["UpdateExpression"],
+                        ExpressionAttributeNames=spec.get("ExpressionAttributeNames"),
+                        ExpressionAttributeValues=spec.get("ExpressionAttributeValues"),
+                    )
+                elif action == "Delete":
+                    self.delete_item(spec["TableName"], spec["Key"])
+        return {}
+
+    def _check(self, table, key, condition, names, values, operation):
+        current = table.get(key)
+        if condition and not expressions.evaluate_condition(condition, current or {}, names, _to_storage(values or {})):
+            raise _error("ConditionalCheckFailedException", "The conditional request failed", operation)
+        return current
+
+
+class MemoryBatchWriter:
+    """Buffers writes and sends them as BatchWriteItem calls of 25, like boto3's."""
+
+    def __init__(self, table):
+        self._table = table
+        self._requests = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self._flush()
+        return False
+
+    def put_item(self, Item):
+        self._requests.append({"PutRequest": {"Item": Item}})
+        if len(self._requests) >= 25:
+            self._flush()
+
+    def delete_item(self, Key):
+        self._requests.append({"DeleteRequest": {"Key": Key}})
+        if len(self._requests) >= 25:
+            self._flush()
+
+    def _flush(self):
+        while self._requests:
+            chunk, self._requests = self._requests[:25], self._requests[25:]
+            self._table.meta.client.batch_write_item(RequestItems={self._table.name: chunk})
+
+
+class MemoryTableResource:
+    """boto3 `Table` look-alike; accepts boto3 condition objects."""
+
+    def __init__(self, client: MemoryDynamoClient, name: str):
+        self.name = name
+        self.table_name = name
+        self.meta = _Meta(_ConditionRenderingClient(client))
+
+    def __getattr__(self, operation):
+        method = getattr(self.meta.client, operation)
+        return lambda **kwargs: method(TableName=self.name, **kwargs)
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return MemoryBatchWriter(self)
+
+
+class _Meta:
+    def __init__(self, client):
+        self.client = client
+
+
+class _ConditionRenderingClient:
+    """Renders boto3 Key/Attr objects to expression strings, like boto3's injector."""
+
+    _EXPRESSION_PARAMS = {"KeyConditionExpression": True, "FilterExpression": False, "ConditionExpression": False}
+
+    def __init__(self, client: MemoryDynamoClient):
+        self._client = client
+
+    def __getattr__(self, operation):
+        method = getattr(self._client, operation)
+
+        def call(**kwargs):
+            from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+
+            builder = ConditionExpressionBuilder()
+            for param, is_key in self._EXPRESSION_PARAMS.items():
+                condition = kwargs.get(param)
+                if isinstance(condition, ConditionBase):
+                    built = builder.build_expression(condition, is_key_condition=is_key)
+                    kwargs[param] = built.condition_expression
+                    kwargs.setdefault("ExpressionAttributeNames", {}).update(built.attribute_name_placeholders)
+                    kwargs.setdefault("ExpressionAttributeValues", {}).update(built.attribute_value_placeholders)
+            return method(**kwargs)
+
+        return call
+
+
+class _Counted:
+    """
+    Counts every API call made on a stand-in client, per `service.operation`,
+    and reports its latency to src/common/metrics.py like the botocore hook.
+    """
+
+    def __init__(self, service: str, target, backend):
+        self._service = service
+        self._target = target
+        self._backend = backend
+
+    def __getattr__(self, operation):
+        method = getattr(self._target, operation)
+        if operation.startswith("_") or not callable(method):
+            return method
+        label = f"{self._service}.{operation}"
+
+        def call(*args, **kwargs):
+            with self._backend.lock:
+                self._backend.calls[label] += 1
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                metrics.record_aws_call(label, time.perf_counter() - started)
+
+        return call
+
+
+class MemoryDynamoResource:
+    def __init__(self, backend):
+        self._client = _Counted("dynamodb", MemoryDynamoClient(backend), backend)
+        self.meta = _Meta(_ConditionRenderingClient(self._client))
+
+    def Table(self, name: str):
+        return MemoryTableResource(self._client, name)
+
+    def batch_get_item(self, **kwargs):
+        return self._client.batch_get_item(**kwargs)
+
+    def batch_write_item(self, **kwargs):
+        return self._client.batch_write_item(**kwargs)
+
+
+class MemoryEventBridge:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def put_events(self, Entries):
+        results = []
+        for entry in Entries:
+            event_id = f"evt-{next(self._backend.ids)}"
+            self._backend.enqueue(("event", event_id, entry))
+            results.append({"EventId": event_id})
+        return {"FailedEntryCount": 0, "Entries": results}
+
+
+class MemorySNS:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def publish(self, TopicArn, Message, Subject=None, MessageAttributes=None, **_):
+        message_id = f"msg-{next(self._backend.ids)}"
+        self._backend.notifications.append(
+            {"TopicArn": TopicArn, "Message": Message, "Subject": Subject, "MessageAttributes": MessageAttributes}
+        )
+        return {"MessageId": message_id}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        successful = []
+        for entry in PublishBatchRequestEntries:
+            result = self.publish(TopicArn, entry["Message"], entry.get("Subject"), entry.get("MessageAttributes"))
+            successful.append({"Id": entry["Id"], "MessageId": result["MessageId"]})
+        return {"Successful": successful, "Failed": []}
+
+
+class MemoryStepFunctions:
+    """The order workflow: one SQS task-token step per stage."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.tokens: dict[str, dict] = {}
+
+    def start_execution(self, stateMachineArn=None, input="{}", **_):
+        execution = json.loads(input)
+        execution_arn = f"{stateMachineArn}:exec-{next(self._backend.ids)}"
+        self._send_stage(execution, 0)
+        return {"executionArn": execution_arn}
+
+    def send_task_success(self, taskToken, output):
+        with self._backend.lock:
+            task = self.tokens.pop(taskToken, None)
+            if task is None:
+                raise _error("TaskTimedOut", "Task Timed Out", "SendTaskSuccess")
+            if task["step"] + 1 < len(WORKFLOW_STAGES):
+                self._send_stage(task["execution"], task["step"] + 1)
+            else:
+                self._backend.completed_executions += 1
+        return {}
+
+    def _send_stage(self, execution: dict, step: int):
+        stage = WORKFLOW_STAGES[step]
+        token = f"token-{next(self._backend.ids)}"
+        self.tokens[token] = {"execution": execution, "step": step}
+        body = {"taskToken": token, "orderId": execution.get("orderId"), "tenantId": execution.get("tenantId"), "stage": stage}
+        self._backend.enqueue(("sqs", stage, {"messageId": f"sqs-{next(self._backend.ids)}", "body": json.dumps(body)}, 1))
+
+
+class _StreamingBody:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self, amt: int | None = None) -> bytes:
+        data, self._data = (self._data, b"") if amt is None else (self._data[:amt], self._data[amt:])
+        return data
+
+
+class MemoryS3:
+    def __init__(self, backend):
+        self._backend = backend
+        self._uploads: dict[str, dict] = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, ContentEncoding=None, IfMatch=None, IfNoneMatch=None, **_):
+        data = Body.encode() if isinstance(Body, str) else bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._backend.lock:
+            current = self._backend.objects.get((Bucket, Key))
+            if (IfNoneMatch == "*" and current is not None) or (
+                IfMatch is not None and (current is None or current["ETag"] != IfMatch)
+            ):
+                raise _error("PreconditionFailed", "At least one of the pre-conditions you specified did not hold",
+                             "PutObject")
+            self._backend.objects[(Bucket, Key)] = {
+                "Body": data,
+                "ETag": etag,
+                "ContentType": ContentType,
+                "ContentEncoding": ContentEncoding,
+            }
+        return {"ETag": etag}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, ContentEncoding=None, **_):
+        upload_id = f"upload-{next(self._backend.ids)}"
+        with self._backend.lock:
+            self._uploads[upload_id] = {
+                "Bucket": Bucket,
+                "Key": Key,
+                "ContentType": ContentType,
+                "ContentEncoding": ContentEncoding,
+                "parts": {},
+            }
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **_):
+        data = bytes(Body)
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._backend.lock:
+            upload = self._uploads.get(UploadId)
+            if upload is None:
+                raise _error("NoSuchUpload", "The specified upload does not exist.", "UploadPart")
+            upload["parts"][PartNumber] = (etag, data)
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **_):
+        with self._backend.lock:
+            upload = self._uploads.pop(UploadId, None)
+            if upload is None:
+                raise _error("NoSuchUpload", "The specified upload does not exist.", "CompleteMultipartUpload")
+            parts = MultipartUpload["Parts"]
+            for index, part in enumerate(parts):
+                etag, data = upload["parts"].get(part["PartNumber"], (None, b""))
+                if etag != part["ETag"]:
+                    raise _error("InvalidPart", "One or more of the specified parts could not be found.",
+                                 "CompleteMultipartUpload")
+                if index < len(parts) - 1 and len(data) < S3_MIN_PART_SIZE:
+                    raise _error("EntityTooSmall", "Your proposed upload is smaller than the minimum allowed size",
+                                 "CompleteMultipartUpload")
+            data = b"".join(upload["parts"][part["PartNumber"]][1] for part in parts)
+            self._backend.objects[(Bucket, Key)] = {
+                "Body": data,
+                "ETag": f'"{hashlib.md5(data).hexdigest()}-{len(parts)}"',
+                "ContentType": upload["ContentType"],
+                "ContentEncoding": upload["ContentEncoding"],
+            }
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **_):
+        with self._backend.lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **_):
+        params = Params or {}
+        return f"https://{params.get('Bucket')}.s3.local/{params.get('Key')}?X-Amz-Expires={ExpiresIn}"
+
+    def get_object(self, Bucket, Key, **_):
+        with self._backend.lock:
+            stored = self._backend.objects.get((Bucket, Key))
+        if stored is None:
+            raise _error("NoSuchKey", "The specified key does not exist.", "GetObject")
+        result = {k: v for k, v in stored.items() if v is not None and k != "Body"}
+        return {**result, "Body": _StreamingBody(stored["Body"]), "ContentLength": len(stored["Body"])}
+
+
+class MemoryWebSocketApi:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def post_to_connection(self, ConnectionId, Data):
+        if ConnectionId in self._backend.gone_connections:
+            raise _error("GoneException", "Gone", "PostToConnection")
+        with self._backend.lock:
+            self._backend.frames.setdefault(ConnectionId, []).append(Data)
+        return {}
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = itertools.count(1)
+        self.tables: dict[str, MemoryTable] = {}
+        self.pending: deque = deque()
+        self.notifications: list = []
+        self.frames: dict[str, list] = {}
+        self.gone_connections: set = set()
+        self.dead_letters: list = []
+        # (bucket, key) -> {"Body": bytes, "ETag", "ContentType", "ContentEncoding"}
+        self.objects: dict = {}
+        self.completed_executions = 0
+        self.calls: Counter = Counter()
+        # Runs a queued Lambda invocation; harnesses may wrap it to time handlers.
+        self.invoke = _invoke
+        self.event_routes = load_event_routes()
+        self.dynamodb = MemoryDynamoResource(self)
+        self.clients = {
+            "dynamodb": self.dynamodb.meta.client,
+            "events": _Counted("events", MemoryEventBridge(self), self),
+            "sns": _Counted("sns", MemorySNS(self), self),
+            "stepfunctions": _Counted("stepfunctions", MemoryStepFunctions(self), self),
+            "apigatewaymanagementapi": _Counted("apigatewaymanagementapi", MemoryWebSocketApi(self), self),
+            "s3": _Counted("s3", MemoryS3(self), self),
+        }
+
+    def table(self, name: str) -> MemoryTable:
+        table = self.tables.get(name)
+        if table is None:
+            schema = next(
+                (spec for env, spec in TABLE_SCHEMAS.items() if os.environ.get(env) == name),
+                None,
+            )
+            if schema is None:
+                raise _error("ResourceNotFoundException", f"Requested resource not found: {name}", "DescribeTable")
+            table = self.tables[name] = MemoryTable(name, schema["key"], schema["indexes"])
+        return table
+
+    def client(self, service: str):
+        if service not in self.clients:
+            raise NotImplementedError(f"memory backend has no {service} client")
+        return self.clients[service]
+
+    def resource(self, service: str):
+        if service != "dynamodb":
+            raise NotImplementedError(f"memory backend has no {service} resource")
+        return self.dynamodb
+
+    def enqueue(self, delivery):
+        with self.lock:
+            self.pending.append(delivery)
+
+    def drain(self, max_deliveries: int | None = None) -> int:
+        """Run queued Lambda invocations (and whatever they enqueue). Returns how many ran."""
+        ran = 0
+        while max_deliveries is None or ran < max_deliveries:
+            with self.lock:
+                if not self.pending:
+                    return ran
+                delivery = self.pending.popleft()
+                batch = [delivery]
+                if delivery[0] == "sqs":
+                    # SQS event source mapping: gather up to a batch of the same queue.
+                    same_queue = [d for d in self.pending if d[0] == "sqs" and d[1] == delivery[1]]
+                    for extra in same_queue[: SQS_BATCH_SIZE - 1]:
+                        self.pending.remove(extra)
+                        batch.append(extra)
+            if delivery[0] == "event":
+                self._deliver_event(delivery[1], delivery[2])
+            else:
+                self._deliver_sqs(delivery[1], batch)
+            ran += 1
+        return ran
+
+    def _deliver_event(self, event_id: str, entry: dict):
+        event = {
+            "id": event_id,
+            "source": entry["Source"],
+            "detail-type": entry["DetailType"],
+            "detail": json.loads(entry["Detail"]),
+        }
+        for pattern, (kind, target) in self.event_routes:
+            if not _matches(pattern, event):
+                continue
+            if kind == "workflow":
+                # The rule's InputPath is $.detail.
+                self.clients["stepfunctions"].start_execution(
+                    stateMachineArn=os.environ.get("ORDER_WORKFLOW_ARN"), input=entry["Detail"]
+                )
+            elif kind == "sqs":
+                record = {"messageId": f"sqs-{next(self.ids)}", "body": json.dumps(event)}
+                self.enqueue(("sqs", target, record, 1))
+            else:
+                self.invoke(target, event)
+
+    def _deliver_sqs(self, stage: str, batch: list):
+        records = {record["messageId"]: (record, receives) for _, _, record, receives in batch}
+        result = self.invoke(SQS_HANDLERS[stage], {"Records": [record for record, _ in records.values()]}) or {}
+        for failure in result.get("batchItemFailures") or []:
+            record, receives = records[failure["itemIdentifier"]]
+            if receives >= SQS_MAX_RECEIVES:
+                self.dead_letters.append((stage, record))
+            else:
+                self.enqueue(("sqs", stage, record, receives + 1))
+
+
+def load_event_routes(path: Path = SERVERLESS_YML) -> list[tuple[dict, tuple]]:
+    """
+    (EventPattern, target) pairs for the event bus, in serverless.yml order:
+    the AWS::Events::Rule resources (targets through RULE_TARGETS) and the
+    `eventBridge` events of the functions (target: the function's handler).
+    """
+    import yaml  # dev dependency; only the memory backend reads serverless.yml
+
+    class Loader(yaml.SafeLoader):
+        pass
+
+    # CloudFormation short forms (!Ref, !GetAtt, !Sub, ...) keep their raw value.
+    Loader.add_multi_constructor("!", _construct_tagged)
+    config = yaml.load(path.read_text(), Loader=Loader)
+
+    routes = []
+    for resource in ((config.get("resources") or {}).get("Resources") or {}).values():
+        if resource.get("Type") != "AWS::Events::Rule":
+            continue
+        properties = resource["Properties"]
+        for target in properties.get("Targets") or []:
+            logical_id = _logical_id(target["Arn"])
+            if logical_id not in RULE_TARGETS:
+                raise NotImplementedError(f"memory backend cannot deliver events to {logical_id}")
+            routes.append((properties["EventPattern"], RULE_TARGETS[logical_id]))
+
+    # `functions` is a map, or a list mixing maps and ${file(...)} includes.
+    functions = config.get("functions") or {}
+    for group in functions if isinstance(functions, list) else [functions]:
+        if not isinstance(group, dict):
+            continue
+        for function in group.values():
+            for function_event in function.get("events") or []:
+                if isinstance(function_event, dict) and "eventBridge" in function_event:
+                    handler_path = function["handler"].replace("/", ".")
+                    routes.append((function_event["eventBridge"]["pattern"], ("lambda", handler_path)))
+    return routes
+
+
+def _construct_tagged(loader, _suffix, node):
+    if node.id == "scalar":
+        return loader.construct_scalar(node)
+    if node.id == "sequence":
+        return loader.construct_sequence(node)
+    return loader.construct_mapping(node)
+
+
+def _logical_id(arn) -> str:
+    # !GetAtt Queue.Arn, {"Fn::GetAtt": [Queue, Arn]} or {"Ref": ...}
+    if isinstance(arn, dict):
+        arn = arn.get("Fn::GetAtt") or arn.get("Ref")
+    if isinstance(arn, list):
+        return arn[0]
+    return str(arn).split(".")[0]
+
+
+def _matches(pattern: dict, event: dict) -> bool:
+    """EventBridge pattern matching, limited to what serverless.yml uses: exact values and `prefix`."""
+    for field, expected in pattern.items():
+        value = event.get(field)
+        if isinstance(expected, dict):
+            if not isinstance(value, dict) or not _matches(expected, value):
+                return False
+        elif not any(_matches_value(option, value) for option in expected):
+            return False
+    return True
+
+
+def _matches_value(option, value) -> bool:
+    if isinstance(option, dict):
+        return "prefix" in option and isinstance(value, str) and value.startswith(option["prefix"])
+    return option == value
+
+
+def _invoke(handler_path: str, event: dict):
+    module_name, _, function = handler_path.rpartition(".")
+    return getattr(importlib.import_module(module_name), function)(event, None)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def configure_local_env():
+    """Fill in the env vars serverless.yml would inject, without overriding any."""
+    for name, value in LOCAL_ENV.items():
+        os.environ.setdefault(name, value)
+
+
+def get_backend() -> MemoryBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                configure_local_env()
+                _backend = MemoryBackend()
+    return _backend
+
+
+def reset_backend() -> MemoryBackend:
+    """Drop all in-memory state (tables, queues, recorded messages)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+    return get_backend()
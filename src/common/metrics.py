@@ -0,0 +1,182 @@
+import functools
+import os
+import threading
+import time
+
+from src.common.encoding import dumps as json_dumps
+
+# Handler instrumentation. `instrumented` times every invocation and, through
+# the AWS call hook installed on the shared clients (src/common/clients.py;
+# the memory backend calls record_aws_call itself), the latency and count of
+# each `service.operation` it makes. Each invocation is reported as one log
+# line in CloudWatch Embedded Metric Format, or folded into summary() when
+# METRICS_MODE=local (the default with KFC_BACKEND=memory).
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "KFC/Orders")
+
+_lock = threading.Lock()
+# Invocations in progress, innermost last. Lambda runs one at a time per
+# container; AWS calls made from worker threads count for the current one.
+_stack: list[dict] = []
+_cold = True
+# handler -> {"invocations", "coldStarts", "ms", "requestBytes", "responseBytes", "aws": {label: [calls, ms]}}
+_summary: dict[str, dict] = {}
+
+
+def metrics_mode() -> str:
+    default = "local" if os.environ.get("KFC_BACKEND", "aws").lower() == "memory" else "emf"
+    return os.environ.get("METRICS_MODE", default).lower()
+
+
+def instrumented(handler):
+    """
+    Handler decorator: records total latency, cold start, payload sizes and
+    the AWS calls made during the invocation. Goes outermost, so rejected
+    requests (e.g. by @authenticated) are measured too.
+    """
+    name = handler.__module__.removeprefix("src.handlers.")
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold
+        if metrics_mode() == "off":
+            return handler(event, context)
+        invocation = {"handler": name, "cold": _cold, "aws": {}}
+        _cold = False
+        with _lock:
+            _stack.append(invocation)
+        started = time.perf_counter()
+        result = None
+        try:
+            result = handler(event, context)
+            return result
+        finally:
+            invocation["ms"] = (time.perf_counter() - started) * 1000
+            with _lock:
+                _stack.remove(invocation)
+            invocation["requestBytes"] = _request_size(event)
+            invocation["responseBytes"] = _response_size(result)
+            _report(invocation)
+
+    return wrapper
+
+
+def record_aws_call(label: str, seconds: float):
+    """Attribute one AWS call (`service.operation`) to the current invocation."""
+    with _lock:
+        if not _stack:
+            return
+        totals = _stack[-1]["aws"].setdefault(label, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds * 1000
+
+
+def install_hooks(client, service: str):
+    """Register the timing hook on a botocore client's event system."""
+    from botocore import xform_name
+
+    def before_call(context, **_):
+        # From parameter building on, so serialization counts as part of the call.
+        context["kfcStarted"] = time.perf_counter()
+
+    def after_call(model, context, **_):
+        started = context.pop("kfcStarted", None)
+        if started is not None:
+            record_aws_call(f"{service}.{xform_name(model.name)}", time.perf_counter() - started)
+
+    events = client.meta.events
+    events.register("before-parameter-build", before_call, unique_id="kfc-metrics-before")
+    events.register("after-call", after_call, unique_id="kfc-metrics-after")
+    events.register("after-call-error", after_call, unique_id="kfc-metrics-error")
+
+
+def summary() -> dict:
+    """Per-handler aggregates of the invocations seen in local mode."""
+    report = {}
+    with _lock:
+        for name, totals in sorted(_summary.items()):
+            n = totals["invocations"]
+            aws_ms = sum(ms for _calls, ms in totals["aws"].values())
+            report[name] = {
+                "invocations": n,
+                "coldStarts": totals["coldStarts"],
+                "avgMs": round(totals["ms"] / n, 3),
+                "avgAwsMs": round(aws_ms / n, 3),
+                "avgRequestBytes": round(totals["requestBytes"] / n),
+                "avgResponseBytes": round(totals["responseBytes"] / n),
+                "aws": {
+                    label: {"callsPerInvocation": round(calls / n, 2), "avgMs": round(ms / n, 3)}
+                    for label, (calls, ms) in sorted(totals["aws"].items(), key=lambda kv: -kv[1][1])
+                },
+            }
+    return report
+
+
+def reset():
+    global _cold
+    with _lock:
+        _summary.clear()
+        _cold = True
+
+
+def _report(invocation: dict):
+    if metrics_mode() == "local":
+        with _lock:
+            totals = _summary.setdefault(
+                invocation["handler"],
+                {"invocations": 0, "coldStarts": 0, "ms": 0.0, "requestBytes": 0, "responseBytes": 0, "aws": {}},
+            )
+            totals["invocations"] += 1
+            totals["coldStarts"] += invocation["cold"]
+            totals["ms"] += invocation["ms"]
+            totals["requestBytes"] += invocation["requestBytes"]
+            totals["responseBytes"] += invocation["responseBytes"]
+            for label, (calls, ms) in invocation["aws"].items():
+                aws = totals["aws"].setdefault(label, [0, 0.0])
+                aws[0] += calls
+                aws[1] += ms
+        return
+    print(json_dumps(emf_record(invocation)))
+
+
+def emf_record(invocation: dict) -> dict:
+    metrics = [
+        ("Duration", "Milliseconds", round(invocation["ms"], 3)),
+        ("ColdStart", "Count", int(invocation["cold"])),
+        ("AwsCalls", "Count", sum(calls for calls, _ms in invocation["aws"].values())),
+        ("AwsDuration", "Milliseconds", round(sum(ms for _calls, ms in invocation["aws"].values()), 3)),
+        ("RequestBytes", "Bytes", invocation["requestBytes"]),
+        ("ResponseBytes", "Bytes", invocation["responseBytes"]),
+    ]
+    for label, (calls, ms) in invocation["aws"].items():
+        metrics.append((f"{label}.Calls", "Count", calls))
+        metrics.append((f"{label}.Duration", "Milliseconds", round(ms, 3)))
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Handler"]],
+                    "Metrics": [{"Name": metric, "Unit": unit} for metric, unit, _value in metrics],
+                }
+            ],
+        },
+        "Handler": invocation["handler"],
+        **{metric: value for metric, _unit, value in metrics},
+    }
+
+
+def _request_size(event) -> int:
+    if not isinstance(event, dict):
+        return 0
+    if isinstance(event.get("body"), str):
+        return len(event["body"].encode())
+    if "Records" in event:
+        return sum(len((record.get("body") or "").encode()) for record in event["Records"])
+    return len(json_dumps(event.get("detail") or {}).encode())
+
+
+def _response_size(result) -> int:
+    if isinstance(result, dict) and isinstance(result.get("body"), str):
+        return len(result["body"].encode())
+    return 0
@@ -4,52 +4,57 @@ import time
 import hmac
 import hashlib
 import base64
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from decimal import Decimal
 
-import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
-dynamodb = boto3.resource("dynamodb")
-eventbridge = boto3.client("events")
-sns = boto3.client("sns")
-sfn = boto3.client("stepfunctions")
+from src.common.clients import get_client, get_resource
+from src.common.encoding import dumps as json_dumps, to_dynamo as to_decimal  # noqa: F401 - re-exported
+from src.common.logs import get_logger
 
+logger = get_logger(__name__)
 
-def get_ws_client():
-    """
-    Lazily create ApiGatewayManagementApi client using the websocket endpoint
-    provided by Serverless. We create a new client per invocation to avoid
-    cross-endpoint reuse when deployed across stages.
-    """
-    endpoint = os.environ["WEBSOCKET_API_ENDPOINT"]
-    return boto3.client("apigatewaymanagementapi", endpoint_url=endpoint)
+# Module-level aliases kept for callers that still do `utils.sfn` etc.; the
+# clients are only built on first access.
+_LAZY_CLIENTS = {
+    "dynamodb": lambda: get_resource("dynamodb"),
+    "eventbridge": lambda: get_client("events"),
+    "sns": lambda: get_client("sns"),
+    "sfn": lambda: get_client("stepfunctions"),
+}
 
 
-def now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def __getattr__(name):
+    if name in _LAZY_CLIENTS:
+        return _LAZY_CLIENTS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def to_decimal(value):
-    if isinstance(value, list):
-        return [to_decimal(v) for v in value]
-    if isinstance(value, dict):
-        return {k: to_decimal(v) for k, v in value.items()}
-    if isinstance(value, float):
-        return Decimal(str(value))
-    return value
+WS_MAX_POOL_CONNECTIONS = int(os.environ.get("WS_MAX_POOL_CONNECTIONS", "32"))
+WS_FANOUT_CONCURRENCY = int(os.environ.get("WS_FANOUT_CONCURRENCY", "16"))
 
 
-def json_dumps(obj) -> str:
-    def _convert(o):
-        if isinstance(o, (datetime,)):
-            return o.isoformat()
-        if isinstance(o, Decimal):
-            return float(o)
-        return str(o)
+def get_ws_client():
+    """
+    ApiGatewayManagementApi client for the websocket endpoint provided by
+    Serverless. Clients are cached per endpoint (so stages never share one) and
+    sized to keep a warm connection per fan-out worker.
+    """
+    from botocore.config import Config
+
+    return get_client(
+        "apigatewaymanagementapi",
+        endpoint_url=os.environ["WEBSOCKET_API_ENDPOINT"],
+        config=Config(max_pool_connections=WS_MAX_POOL_CONNECTIONS),
+    )
 
-    return json.dumps(obj, default=_convert)
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
 
 
 def response(status: int, body: dict | list | str, headers: dict | None = None):
@@ -60,34 +65,340 @@ def response(status: int, body: dict | list | str, headers: dict | None = None):
 
 
 def get_table(name_env: str):
-    return dynamodb.Table(os.environ[name_env])
+    return get_resource("dynamodb").Table(os.environ[name_env])
 
 
-def publish_event(detail_type: str, detail: dict, source: str = "kfc.orders"):
-    eventbridge.put_events(
-        Entries=[
-            {
-                "Source": source,
-                "DetailType": detail_type,
-                "Detail": json_dumps(detail),
-                "EventBusName": os.environ["EVENT_BUS_NAME"],
-            }
+def read_tenant_counter(tenant_id: str, attribute: str) -> int | None:
+    """A version counter kept on the tenant item, or None if it was never bumped."""
+    item = get_table("TENANTS_TABLE").get_item(
+        Key={"tenantId": tenant_id},
+        ProjectionExpression="#counter",
+        ExpressionAttributeNames={"#counter": attribute},
+    ).get("Item")
+    value = (item or {}).get(attribute)
+    return None if value is None else int(value)
+
+
+def bump_tenant_counter(tenant_id: str, attribute: str):
+    """Increment a version counter on the tenant item; unknown tenants are left alone."""
+    try:
+        get_table("TENANTS_TABLE").update_item(
+            Key={"tenantId": tenant_id},
+            UpdateExpression="ADD #counter :one",
+            ConditionExpression="attribute_exists(tenantId)",
+            ExpressionAttributeNames={"#counter": attribute},
+            ExpressionAttributeValues={":one": 1},
+        )
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+
+def query_all(table, **kwargs):
+    """
+    Yield every item of a Query, following LastEvaluatedKey across pages.
+    `table` may be a Table resource or a low-level client (with TableName).
+    """
+    while True:
+        result = table.query(**kwargs)
+        yield from result.get("Items", [])
+        last_key = result.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def scan_tenant_ids():
+    """Yield the id of every tenant, for jobs that run across tenants."""
+    table = get_table("TENANTS_TABLE")
+    kwargs = {"ProjectionExpression": "tenantId"}
+    while True:
+        result = table.scan(**kwargs)
+        for item in result.get("Items", []):
+            yield item["tenantId"]
+        if not result.get("LastEvaluatedKey"):
+            return
+        kwargs["ExclusiveStartKey"] = result["LastEvaluatedKey"]
+
+
+BATCH_GET_MAX_KEYS = 100
+BATCH_MAX_ATTEMPTS = 5
+
+
+def batch_get_items(table, keys: list[dict], projection: str | None = None, names: dict | None = None) -> list[dict]:
+    """
+    Fetch many items from one table with BatchGetItem, chunked to the 100-key
+    limit and retrying UnprocessedKeys with exponential backoff.
+    """
+    found = []
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request = {"Keys": keys[start : start + BATCH_GET_MAX_KEYS]}
+        if projection:
+            request["ProjectionExpression"] = projection
+        if names:
+            request["ExpressionAttributeNames"] = names
+        pending = {table.name: request}
+        attempt = 0
+        while pending:
+            result = get_resource("dynamodb").batch_get_item(RequestItems=pending)
+            found.extend(result.get("Responses", {}).get(table.name, []))
+            pending = result.get("UnprocessedKeys") or {}
+            if pending:
+                attempt += 1
+                if attempt >= BATCH_MAX_ATTEMPTS:
+                    raise RuntimeError(f"BatchGetItem left unprocessed keys on {table.name}")
+                time.sleep(min(0.05 * (2**attempt), 1.0))
+    return found
+
+
+EVENTBRIDGE_MAX_ENTRIES = 10
+EVENTBRIDGE_MAX_REQUEST_BYTES = 256 * 1024
+EVENTBRIDGE_MAX_ATTEMPTS = 4
+
+
+def _event_entry(detail_type: str, detail: dict, source: str) -> dict:
+    return {
+        "Source": source,
+        "DetailType": detail_type,
+        "Detail": json_dumps(detail),
+        "EventBusName": os.environ["EVENT_BUS_NAME"],
+    }
+
+
+def _event_entry_size(entry: dict) -> int:
+    # Same accounting EventBridge uses for the PutEvents size limit.
+    size = 14 if "Time" in entry else 0
+    for field in ("Source", "DetailType", "Detail"):
+        size += len(entry[field].encode())
+    return size + sum(len(r.encode()) for r in entry.get("Resources", []))
+
+
+class EventPublisher:
+    """
+    Buffers EventBridge entries and sends them packed into as few PutEvents
+    calls as the 10-entry / 256 KB limits allow. Entries rejected by the bus
+    (FailedEntryCount) are retried alone with backoff; the ones that never
+    make it, including whole batches whose PutEvents call raised, are raised
+    in EventPublishError.entries, the same dicts `add` returned. Use it as a context manager to flush on a clean exit:
+
+        with EventPublisher() as events:
+            events.add("order.created", {...})
+    """
+
+    def __init__(self, source: str = "kfc.orders"):
+        self.source = source
+        self._pending: list[dict] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        # Nothing is published for a block that failed.
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def add(self, detail_type: str, detail: dict, source: str | None = None) -> dict:
+        entry = _event_entry(detail_type, detail, source or self.source)
+        if _event_entry_size(entry) > EVENTBRIDGE_MAX_REQUEST_BYTES:
+            raise ValueError(f"{detail_type} event exceeds the PutEvents size limit")
+        self._pending.append(entry)
+        return entry
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        failed = []
+        for batch in _pack_entries(pending):
+            failed.extend(_put_entries(batch))
+        if failed:
+            raise EventPublishError(failed)
+
+
+def _pack_entries(entries: list[dict]):
+    batch, batch_size = [], 0
+    for entry in entries:
+        size = _event_entry_size(entry)
+        if batch and (len(batch) == EVENTBRIDGE_MAX_ENTRIES or batch_size + size > EVENTBRIDGE_MAX_REQUEST_BYTES):
+            yield batch
+            batch, batch_size = [], 0
+        batch.append(entry)
+        batch_size += size
+    if batch:
+        yield batch
+
+
+def _put_entries(entries: list[dict]) -> list[dict]:
+    """Send one packed batch, retrying only failed entries. Returns what never made it."""
+    attempt = 0
+    while entries:
+        try:
+            result = get_client("events").put_events(Entries=entries)
+        except (BotoCoreError, ClientError) as exc:
+            # Earlier batches already went out; only this one is reported.
+            logger.error("PutEvents failed for %d entries: %r", len(entries), exc)
+            return entries
+        if not result.get("FailedEntryCount"):
+            return []
+        entries = [
+            entry
+            for entry, outcome in zip(entries, result.get("Entries", []))
+            if outcome.get("ErrorCode")
         ]
-    )
+        attempt += 1
+        if attempt >= EVENTBRIDGE_MAX_ATTEMPTS:
+            return entries
+        time.sleep(min(0.1 * (2**attempt), 2.0))
+    return []
 
 
-def publish_notification(message: str, subject: str | None = None):
-    sns.publish(
-        TopicArn=os.environ["NOTIFICATIONS_TOPIC_ARN"],
-        Message=message,
-        Subject=subject or "kfc-order-notification",
-    )
+def publish_event(detail_type: str, detail: dict, source: str = "kfc.orders"):
+    with EventPublisher(source) as events:
+        events.add(detail_type, detail)
+
+
+SNS_MAX_BATCH_ENTRIES = 10
+SNS_MAX_REQUEST_BYTES = 256 * 1024
+SNS_MAX_ATTEMPTS = 4
+
+
+def _notification_entry(message: dict | str, subject: str | None, attributes: dict | None) -> dict:
+    entry = {
+        "Message": message if isinstance(message, str) else json_dumps(message),
+        "Subject": subject or "kfc-order-notification",
+    }
+    attributes = {name: value for name, value in (attributes or {}).items() if value is not None}
+    if attributes:
+        # String attributes so subscribers can use SNS filter policies.
+        entry["MessageAttributes"] = {
+            name: {"DataType": "String", "StringValue": str(value)} for name, value in attributes.items()
+        }
+    return entry
+
+
+def _notification_entry_size(entry: dict) -> int:
+    size = len(entry["Message"].encode()) + len(entry["Subject"].encode())
+    for name, attribute in (entry.get("MessageAttributes") or {}).items():
+        size += len(name.encode()) + len(attribute["DataType"]) + len(attribute["StringValue"].encode())
+    return size
+
+
+class NotificationPublisher:
+    """
+    Buffers SNS notifications (JSON body + message attributes) and sends them
+    with PublishBatch, packed by the 10-entry / 256 KB limits. Entries SNS
+    fails on its side are retried with backoff; like EventPublisher, use it as
+    a context manager to flush on a clean exit.
+    """
+
+    def __init__(self, topic_arn: str | None = None):
+        self.topic_arn = topic_arn or os.environ["NOTIFICATIONS_TOPIC_ARN"]
+        self._pending: list[dict] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def add(self, message: dict | str, subject: str | None = None, attributes: dict | None = None) -> dict:
+        entry = _notification_entry(message, subject, attributes)
+        if _notification_entry_size(entry) > SNS_MAX_REQUEST_BYTES:
+            raise ValueError("notification exceeds the SNS message size limit")
+        self._pending.append(entry)
+        return entry
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        failed = []
+        batch, batch_size = [], 0
+        for entry in pending:
+            size = _notification_entry_size(entry)
+            if batch and (len(batch) == SNS_MAX_BATCH_ENTRIES or batch_size + size > SNS_MAX_REQUEST_BYTES):
+                failed.extend(self._publish_batch(batch))
+                batch, batch_size = [], 0
+            batch.append(entry)
+            batch_size += size
+        if batch:
+            failed.extend(self._publish_batch(batch))
+        if failed:
+            raise NotificationPublishError(failed)
+
+    def _publish_batch(self, entries: list[dict]) -> list[dict]:
+        """Publish one packed batch, retrying server-side failures. Returns what never made it."""
+        given_up = []
+        attempt = 0
+        while entries:
+            result = get_client("sns").publish_batch(
+                TopicArn=self.topic_arn,
+                PublishBatchRequestEntries=[{"Id": str(i), **entry} for i, entry in enumerate(entries)],
+            )
+            retry = []
+            for failure in result.get("Failed") or []:
+                entry = entries[int(failure["Id"])]
+                (given_up if failure.get("SenderFault") else retry).append(entry)
+            entries = retry
+            if entries:
+                attempt += 1
+                if attempt >= SNS_MAX_ATTEMPTS:
+                    return given_up + entries
+                time.sleep(min(0.1 * (2**attempt), 2.0))
+        return given_up
+
+
+def publish_notification(message: dict | str, subject: str | None = None, attributes: dict | None = None):
+    with NotificationPublisher() as notifications:
+        notifications.add(message, subject, attributes)
 
 
 def send_ws_message(connection_id: str, payload: dict):
+    _post_to_connection(get_ws_client(), connection_id, json_dumps(payload))
+
+
+def broadcast_ws_message(connection_ids: list[str], payload: dict) -> tuple[list[str], list[str]]:
+    """
+    Post the same payload to many connections in parallel (bounded by
+    WS_FANOUT_CONCURRENCY). Returns `(gone, failed)` connection ids; one bad
+    connection never blocks delivery to the others.
+    """
+    data = json_dumps(payload)
+    return post_ws_frames({connection_id: [data] for connection_id in connection_ids})
+
+
+def post_ws_frames(frames: dict[str, list[str]]) -> tuple[list[str], list[str]]:
+    """
+    Like broadcast_ws_message with per-connection data: `{connection_id:
+    [frame, ...]}`. Connections are served in parallel, each one's frames in
+    order. Returns `(gone, failed)` connection ids.
+    """
+    if not frames:
+        return [], []
     client = get_ws_client()
+    gone, failed = [], []
+    with ThreadPoolExecutor(max_workers=min(len(frames), WS_FANOUT_CONCURRENCY)) as pool:
+        futures = [
+            (connection_id, pool.submit(_post_frames, client, connection_id, data))
+            for connection_id, data in frames.items()
+        ]
+    for connection_id, future in futures:
+        error = future.exception()
+        if isinstance(error, ConnectionGone):
+            gone.append(connection_id)
+        elif error is not None:
+            logger.warning("post_to_connection failed for %s: %r", connection_id, error)
+            failed.append(connection_id)
+    return gone, failed
+
+
+def _post_frames(client, connection_id: str, frames: list[str]):
+    for data in frames:
+        _post_to_connection(client, connection_id, data)
+
+
+def _post_to_connection(client, connection_id: str, data: str):
     try:
-        client.post_to_connection(ConnectionId=connection_id, Data=json_dumps(payload))
+        client.post_to_connection(ConnectionId=connection_id, Data=data)
     except ClientError as exc:
         # If gone, caller should clean up.
         if exc.response["Error"]["Code"] in {"GoneException", "410"}:
@@ -102,6 +413,9 @@ def get_tenant_from_event(event) -> str:
 
 
 def get_user_from_event(event) -> dict:
+    claims = event.get("auth")
+    if claims:
+        return {"userId": claims.get("sub"), "role": claims.get("role")}
     headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
     return {
         "userId": headers.get("x-user-id"),
@@ -113,6 +427,96 @@ def new_id(prefix: str) -> str:
     return f"{prefix}_{uuid.uuid4().hex[:12]}"
 
 
+_CROCKFORD32 = "0123456789abcdefghjkmnpqrstvwxyz"
+_ULID_RANDOM_BITS = 80
+_ulid_lock = threading.Lock()
+_ulid_last = (0, 0)
+
+
+def _base32(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_CROCKFORD32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_sortable_id(prefix: str) -> str:
+    """
+    ULID-style id: 48-bit millisecond timestamp + 80 random bits, Crockford
+    base32 (lowercase). Ids sort by creation time; within one container they
+    are strictly monotonic (same-millisecond ids increment the random part),
+    and the 80 random bits keep concurrent containers from colliding.
+    """
+    global _ulid_last
+    with _ulid_lock:
+        ms = time.time_ns() // 1_000_000
+        last_ms, last_rand = _ulid_last
+        if ms <= last_ms:
+            ms, rand = last_ms, last_rand + 1
+            if rand >> _ULID_RANDOM_BITS:
+                ms, rand = ms + 1, int.from_bytes(os.urandom(10), "big")
+        else:
+            rand = int.from_bytes(os.urandom(10), "big")
+        _ulid_last = (ms, rand)
+    return f"{prefix}_{_base32(ms, 10)}{_base32(rand, 16)}"
+
+
+def sortable_id_bound(prefix: str, moment: datetime, upper: bool = False) -> str:
+    """Smallest (or largest) id `new_sortable_id` can produce at `moment`."""
+    ms = int(moment.timestamp() * 1000)
+    if not 0 <= ms < 1 << 48:
+        raise ValueError(f"{moment.isoformat()} is outside the range of sortable ids")
+    return f"{prefix}_{_base32(ms, 10)}{(_CROCKFORD32[-1] if upper else '0') * 16}"
+
+
+def sortable_id_time(sortable_id: str) -> datetime | None:
+    """When a `new_sortable_id` id was generated, or None for other ids."""
+    encoded = sortable_id.rpartition("_")[2]
+    if len(encoded) != 26 or not all(char in _CROCKFORD32 for char in encoded):
+        return None
+    ms = 0
+    for char in encoded[:10]:
+        ms = ms * 32 + _CROCKFORD32.index(char)
+    return datetime.fromtimestamp(ms / 1000, timezone.utc)
+
+
+def order_ids_sortable_since() -> datetime | None:
+    """
+    When create_order switched to `new_sortable_id` (ORDER_IDS_SORTABLE_SINCE).
+    Older orders may have `new_id` ids (`order_<hex12>`), which do not sort by
+    time; None means any order may.
+    """
+    value = os.environ.get("ORDER_IDS_SORTABLE_SINCE")
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def order_window_query(tenant_id: str, start: datetime, end: datetime) -> dict:
+    """
+    Query arguments for the orders of a tenant created in [start, end]. A
+    window after order_ids_sortable_since() is an orderId range; one reaching
+    back before it reads the whole partition, since legacy ids sort anywhere.
+    createdAt is filtered either way, which also drops legacy ids that happen
+    to fall inside the range.
+    """
+    # Imported here: boto3 is heavy and most handlers never build a query.
+    from boto3.dynamodb.conditions import Attr, Key
+
+    key_condition = Key("tenantId").eq(tenant_id)
+    sortable_since = order_ids_sortable_since()
+    if sortable_since is not None and start >= sortable_since:
+        key_condition &= Key("orderId").between(
+            sortable_id_bound("order", start), sortable_id_bound("order", end, upper=True)
+        )
+    return {
+        "KeyConditionExpression": key_condition,
+        "FilterExpression": Attr("createdAt").between(start.isoformat(), end.isoformat()),
+    }
+
+
 def hash_password(password: str, salt: bytes | None = None) -> tuple[str, str]:
     salt_bytes = salt or os.urandom(16)
     digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt_bytes, 200_000)
@@ -138,7 +542,62 @@ def sign_token(payload: dict, secret: str) -> str:
     return b".".join([header, body, sig]).decode()
 
 
+def _b64url(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _cursor_secret() -> bytes:
+    return os.environ.get("CURSOR_SECRET", "dev-secret").encode()
+
+
+def _cursor_signature(body: str, scope: dict | None) -> bytes:
+    message = body if scope is None else f"{body}.{json_dumps(scope)}"
+    return hmac.new(_cursor_secret(), message.encode(), hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(key: dict, scope: dict | None = None) -> str:
+    """
+    Opaque, HMAC-signed pagination cursor wrapping a DynamoDB LastEvaluatedKey
+    so clients can neither read nor forge ExclusiveStartKeys. `scope` (the
+    index and filters of the query) is signed along with the key, so the
+    cursor is only accepted back for the same query.
+    """
+    body = _b64url(json_dumps(key).encode())
+    return f"{body}.{_b64url(_cursor_signature(body, scope))}"
+
+
+def decode_cursor(cursor: str, scope: dict | None = None) -> dict | None:
+    """
+    Return the key inside a cursor, or None if it is malformed, tampered with
+    or was issued for another scope.
+    """
+    try:
+        body, sig = cursor.split(".")
+        if not hmac.compare_digest(_cursor_signature(body, scope), _b64url_decode(sig)):
+            return None
+        key = json.loads(_b64url_decode(body), parse_float=Decimal)
+    except (ValueError, TypeError):
+        return None
+    return key if isinstance(key, dict) else None
+
+
 class ConnectionGone(Exception):
     def __init__(self, connection_id: str):
         super().__init__(f"connection {connection_id} is gone")
         self.connection_id = connection_id
+
+
+class EventPublishError(Exception):
+    def __init__(self, entries: list[dict]):
+        super().__init__(f"{len(entries)} event(s) could not be published")
+        self.entries = entries
+
+
+class NotificationPublishError(Exception):
+    def __init__(self, entries: list[dict]):
+        super().__init__(f"{len(entries)} notification(s) could not be published")
+        self.entries = entries
@@ -0,0 +1,63 @@
+from src.common.utils import json_dumps
+
+# WebSocket frame formats, negotiated per connection at $connect (?format=):
+#   full     one frame per event: {"type", "detail"} (default, original format)
+#   batch    one frame per router invocation: [{"type", "detail"}, ...]
+#   compact  like batch, with short keys and only what changed for each order
+FORMATS = ("full", "batch", "compact")
+DEFAULT_FORMAT = "full"
+
+EVENT_CODES = {
+    "order.created": "oc",
+    "order.stage.started": "ss",
+    "order.stage.completed": "sc",
+}
+FIELD_CODES = {
+    "orderId": "o",
+    "status": "s",
+    "stage": "g",
+    "actor": "a",
+    "createdAt": "at",
+    "startedAt": "at",
+    "completedAt": "at",
+    "totalAmount": "$",
+}
+
+
+def compact_records(payloads: list[dict]) -> list[dict]:
+    """
+    Short-key records for `{"type", "detail"}` payloads. For order events the
+    tenant is implied by the connection and the workflow by the status; when
+    an order appears more than once, later records only carry the fields that
+    changed. Other events keep their detail under "d".
+    """
+    records = []
+    known: dict[str, dict] = {}
+    for payload in payloads:
+        detail = payload.get("detail") or {}
+        if payload.get("type") not in EVENT_CODES:
+            # Not an order event: pass the detail through untouched.
+            records.append({"e": payload.get("type"), "d": detail})
+            continue
+        record = {FIELD_CODES[k]: v for k, v in detail.items() if k in FIELD_CODES}
+        if payload.get("type") == "order.created" and (detail.get("customer") or {}).get("name"):
+            record["n"] = detail["customer"]["name"]
+        order_id = record.get("o")
+        previous = known.get(order_id) if order_id else None
+        if order_id:
+            known[order_id] = {**(previous or {}), **record}
+        if previous:
+            record = {k: v for k, v in record.items() if k == "o" or previous.get(k) != v}
+        records.append({"e": EVENT_CODES[payload["type"]], **record})
+    return records
+
+
+def build_frames(frame_format: str | None, payloads: list[dict]) -> list[str]:
+    """Serialized frames carrying `payloads` for a connection using `frame_format`."""
+    if not payloads:
+        return []
+    if frame_format == "compact":
+        return [json_dumps(compact_records(payloads))]
+    if frame_format == "batch":
+        return [json_dumps(payloads)]
+    return [json_dumps(payload) for payload in payloads]
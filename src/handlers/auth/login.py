@@ -3,6 +3,8 @@ import time
 
 from boto3.dynamodb.conditions import Key
 
+from src.common.auth import AUTH_TOKEN_TTL_SECONDS, auth_secret
+from src.common.metrics import instrumented
 from src.common.utils import (
     get_table,
     get_tenant_from_event,
@@ -12,6 +14,7 @@ from src.common.utils import (
 )
 
 
+@instrumented
 def handler(event, _context):
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
@@ -41,7 +44,6 @@ def handler(event, _context):
     if not verify_password(password, user["passwordSalt"], user["passwordHash"]):
         return response(401, {"message": "Credenciales inválidas"})
 
-    secret = (event.get("headers") or {}).get("x-auth-secret") or "dev-secret"
     issued_at = int(time.time())
     token = sign_token(
         {
@@ -49,8 +51,9 @@ def handler(event, _context):
             "tenantId": tenant_id,
             "role": user.get("role"),
             "iat": issued_at,
+            "exp": issued_at + AUTH_TOKEN_TTL_SECONDS,
         },
-        secret,
+        auth_secret(),
     )
 
     return response(
@@ -2,6 +2,8 @@ import json
 
 from botocore.exceptions import ClientError
 
+from src.common.auth import ROLES
+from src.common.metrics import instrumented
 from src.common.utils import (
     get_table,
     get_tenant_from_event,
@@ -13,6 +15,7 @@ from src.common.utils import (
 )
 
 
+@instrumented
 def handler(event, _context):
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
@@ -29,6 +32,8 @@ def handler(event, _context):
 
     if not email or not password:
         return response(400, {"message": "email y password son requeridos"})
+    if role not in ROLES:
+        return response(400, {"message": f"role debe ser uno de: {', '.join(ROLES)}"})
 
     salt, hashed = hash_password(password)
     user_id = new_id("user")
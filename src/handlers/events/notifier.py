@@ -0,0 +1,72 @@
+import json
+
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import NotificationPublisher, NotificationPublishError
+
+# detail-type -> stages that reach SNS subscribers (None = every event of
+# that type). Anything else stays on the bus/WebSockets only.
+NOTIFICATION_POLICY = {
+    "tenant.created": None,
+    "order.created": None,
+    "order.stage.completed": ("kitchen", "packaging", "delivery"),
+}
+
+logger = get_logger(__name__)
+
+
+def should_notify(detail_type: str, detail: dict) -> bool:
+    if detail_type not in NOTIFICATION_POLICY:
+        return False
+    stages = NOTIFICATION_POLICY[detail_type]
+    return stages is None or detail.get("stage") in stages
+
+
+@instrumented
+def handler(event, _context):
+    """
+    Forward bus events to the notifications topic. EventBridge delivers them
+    through an SQS queue, so every batch is filtered by NOTIFICATION_POLICY
+    and coalesced into PublishBatch calls. Messages whose notification could
+    not be published are reported in `batchItemFailures` for redelivery.
+    """
+    entries = {}
+    skipped = 0
+    failures = []
+    publisher = NotificationPublisher()
+
+    for record in event.get("Records", []):
+        try:
+            bus_event = json.loads(record["body"])
+        except json.JSONDecodeError:
+            skipped += 1
+            continue
+        detail = bus_event.get("detail") or {}
+        detail_type = bus_event.get("detail-type") or "order.event"
+        tenant_id = detail.get("tenantId")
+        if not tenant_id or not should_notify(detail_type, detail):
+            skipped += 1
+            continue
+        entry = publisher.add(
+            {"type": detail_type, "detail": detail},
+            subject=f"{detail_type} - {tenant_id}",
+            attributes={
+                "eventType": detail_type,
+                "tenantId": tenant_id,
+                "stage": detail.get("stage"),
+                "status": detail.get("status"),
+            },
+        )
+        entries[id(entry)] = record["messageId"]
+
+    try:
+        publisher.flush()
+    except NotificationPublishError as exc:
+        logger.error("%s", exc)
+        failures = [{"itemIdentifier": entries[id(entry)]} for entry in exc.entries]
+
+    return {
+        "batchItemFailures": failures,
+        "published": len(entries) - len(failures),
+        "skipped": skipped,
+    }
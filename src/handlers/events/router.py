@@ -1,49 +1,108 @@
-from boto3.dynamodb.conditions import Key
+import json
 
-from src.common.utils import (
-    ConnectionGone,
-    get_table,
-    publish_notification,
-    response,
-    send_ws_message,
-)
+from src.common.auth import OBSERVER_ROLES
+from src.common.connection_registry import forget, get_connections
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import get_table, post_ws_frames, response
+from src.common.ws_frames import build_frames
 
+# (detail-type, stage) -> screens that act on the event. Observer roles (see
+# src/common/auth.py) get every event; detail types not listed here go to
+# every connection.
+EVENT_ROLES = {
+    ("order.created", None): ("kitchen",),
+    ("order.stage.started", "kitchen"): ("kitchen",),
+    ("order.stage.completed", "kitchen"): ("kitchen", "packaging"),
+    ("order.stage.started", "packaging"): ("packaging",),
+    ("order.stage.completed", "packaging"): ("packaging", "delivery"),
+    ("order.stage.started", "delivery"): ("delivery",),
+    ("order.stage.completed", "delivery"): ("delivery",),
+}
 
+logger = get_logger(__name__)
+
+
+def target_roles(detail_type: str, detail: dict) -> tuple | None:
+    """Roles that should receive the event, or None for every connection."""
+    roles = EVENT_ROLES.get((detail_type, detail.get("stage")))
+    if roles is None:
+        return None
+    return roles + OBSERVER_ROLES
+
+
+@instrumented
 def handler(event, _context):
     """
-    Fan-out EventBridge events to WebSocket clients and SNS subscribers.
+    Fan-out bus events to WebSocket clients. The router consumes the bus
+    through an SQS queue, so one invocation may carry several events: each
+    connection gets them coalesced according to the frame format it chose at
+    $connect (see src/common/ws_frames.py). A plain EventBridge event is
+    accepted too. SNS subscribers are fed by the notifier
+    (src/handlers/events/notifier.py) through its own queue.
     """
-    detail = event.get("detail") or {}
-    detail_type = event.get("detail-type") or event.get("detailType") or "order.event"
-    tenant_id = detail.get("tenantId")
+    by_tenant: dict[str, list] = {}
+    for bus_event in _bus_events(event):
+        detail = bus_event.get("detail") or {}
+        detail_type = bus_event.get("detail-type") or bus_event.get("detailType") or "order.event"
+        tenant_id = detail.get("tenantId")
+        if tenant_id:
+            by_tenant.setdefault(tenant_id, []).append(
+                ({"type": detail_type, "detail": detail}, target_roles(detail_type, detail))
+            )
 
-    if not tenant_id:
+    if not by_tenant:
         # Nothing to deliver
         return response(200, {"message": "No tenant on event"})
 
-    payload = {"type": detail_type, "detail": detail}
     connections_table = get_table("CONNECTIONS_TABLE")
-    stale_connections = []
+    totals = {"delivered": 0, "stale": 0, "failed": 0, "frames": 0}
+    for tenant_id, events in by_tenant.items():
+        _deliver(connections_table, tenant_id, events, totals)
+    return response(200, totals)
+
 
-    result = connections_table.query(
-        KeyConditionExpression=Key("tenantId").eq(tenant_id)
-    )
-    for conn in result.get("Items", []):
+def _bus_events(event) -> list[dict]:
+    if "Records" not in event:
+        return [event]
+    bus_events = []
+    for record in event["Records"]:
         try:
-            send_ws_message(conn["connectionId"], payload)
-        except ConnectionGone:
-            stale_connections.append(conn["connectionId"])
+            bus_events.append(json.loads(record["body"]))
+        except json.JSONDecodeError:
+            logger.warning("skipping invalid message %s", record.get("messageId"))
+    return bus_events
+
 
-    # Clean up disconnected clients
-    for connection_id in stale_connections:
-        connections_table.delete_item(
-            Key={"tenantId": tenant_id, "connectionId": connection_id}
-        )
+def _deliver(connections_table, tenant_id: str, events: list, totals: dict):
+    roles = set()
+    for _payload, event_roles in events:
+        if event_roles is None:
+            roles = None
+            break
+        roles.update(event_roles)
 
-    publish_notification(
-        message=f"{detail_type} for tenant {tenant_id}: {detail}",
-        subject=f"{detail_type} - {tenant_id}",
-    )
+    frames = {}
+    for conn in get_connections(connections_table, tenant_id):
+        if roles is not None and conn.get("role") not in roles:
+            continue
+        payloads = [
+            payload for payload, event_roles in events if event_roles is None or conn.get("role") in event_roles
+        ]
+        if payloads:
+            frames[conn["connectionId"]] = build_frames(conn.get("format"), payloads)
+    stale_connections, failed = post_ws_frames(frames)
 
-    return response(200, {"delivered": len(result.get("Items", [])), "stale": len(stale_connections)})
+    # Clean up disconnected clients (BatchWriteItem, 25 deletes per call)
+    if stale_connections:
+        forget(tenant_id, stale_connections)
+        with connections_table.batch_writer() as batch:
+            for connection_id in stale_connections:
+                batch.delete_item(
+                    Key={"tenantId": tenant_id, "connectionId": connection_id}
+                )
 
+    totals["delivered"] += len(frames) - len(stale_connections) - len(failed)
+    totals["stale"] += len(stale_connections)
+    totals["failed"] += len(failed)
+    totals["frames"] += sum(len(data) for data in frames.values())
@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, time, timedelta, timezone
+
+from src.common.exports import (
+    EXPORT_WORKER_TIMEOUT_SECONDS,
+    current_status,
+    export_orders,
+    load_status,
+    save_status,
+)
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import EventPublisher, EventPublishError, now_iso, scan_tenant_ids
+
+EXPORT_DAILY_FORMAT = os.environ.get("EXPORT_DAILY_FORMAT", "csv")
+
+logger = get_logger(__name__)
+
+
+@instrumented
+def handler(event, context):
+    """
+    Writes exports. `export.requested` bus events (from POST /exports) run
+    the requested export. The daily schedule only fans out: it queues one
+    `export.requested` per tenant for yesterday's orders as `daily-<date>`
+    (EXPORT_DAILY_FORMAT), so each tenant gets its own invocation and
+    timeout, and a rerun replaces the file instead of adding another.
+    """
+    if event.get("detail-type") == "export.requested":
+        detail = event.get("detail") or {}
+        status = load_status(detail.get("tenantId"), detail.get("exportId"))
+        if not status:
+            logger.warning("unknown export %s", detail)
+            return {"exports": 0}
+        if status["status"] == "done" or current_status(status)["status"] == "running":
+            # A redelivered event, or the export is still running elsewhere.
+            return {"exports": 0}
+        run_export(status, context)
+        return {"exports": 1}
+
+    today = datetime.combine(datetime.now(timezone.utc).date(), time(), timezone.utc)
+    start = today - timedelta(days=1)
+    export_id = f"daily-{start.date().isoformat()}"
+    queued, failed = {}, 0
+    with EventPublisher("kfc.exports") as events:
+        for tenant_id in scan_tenant_ids():
+            status = {
+                "exportId": export_id,
+                "tenantId": tenant_id,
+                "format": EXPORT_DAILY_FORMAT,
+                "from": start.isoformat(),
+                "to": today.isoformat(),
+                "status": "pending",
+                "requestedAt": now_iso(),
+            }
+            save_status(status)
+            entry = events.add("export.requested", {"tenantId": tenant_id, "exportId": export_id})
+            queued[id(entry)] = status
+        try:
+            events.flush()
+        except EventPublishError as exc:
+            for entry in exc.entries:
+                status = queued.pop(id(entry))
+                status.update(status="failed", error="export.requested was not published")
+                save_status(status)
+                logger.error("daily export of %s not queued", status["tenantId"])
+                failed += 1
+    return {"queued": len(queued), "failed": failed}
+
+
+def run_export(status: dict, context=None):
+    # The status turns "failed" on its own once the deadline passes, since a
+    # timed-out invocation never gets to write it.
+    remaining_ms = context.get_remaining_time_in_millis() if context else EXPORT_WORKER_TIMEOUT_SECONDS * 1000
+    status.update(
+        status="running",
+        startedAt=now_iso(),
+        deadline=(datetime.now(timezone.utc) + timedelta(milliseconds=remaining_ms)).isoformat(),
+    )
+    status.pop("error", None)
+    save_status(status)
+    try:
+        result = export_orders(
+            status["tenantId"],
+            status["exportId"],
+            status["format"],
+            datetime.fromisoformat(status["from"]),
+            datetime.fromisoformat(status["to"]),
+        )
+    except Exception as exc:
+        status.update(status="failed", error=str(exc))
+        save_status(status)
+        raise
+    status.update(status="done", completedAt=now_iso(), **result)
+    save_status(status)
+    logger.info(
+        "%s %s: %s orders, %s bytes", status["tenantId"], status["exportId"], result["count"], result["bytes"]
+    )
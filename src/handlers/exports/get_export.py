@@ -0,0 +1,23 @@
+from src.common.auth import authenticated
+from src.common.exports import EXPORT_URL_TTL_SECONDS, current_status, download_url, load_status
+from src.common.metrics import instrumented
+from src.common.utils import get_tenant_from_event, response
+
+
+@instrumented
+@authenticated
+def handler(event, _context):
+    """Export status; once done, with a presigned download link. A run past its deadline reads as failed."""
+    tenant_id = get_tenant_from_event(event)
+    export_id = (event.get("pathParameters") or {}).get("exportId")
+    if not tenant_id or not export_id:
+        return response(400, {"message": "tenantId y exportId son requeridos"})
+
+    status = load_status(tenant_id, export_id)
+    if not status:
+        return response(404, {"message": "Exportación no encontrada"})
+    status = current_status(status)
+    if status["status"] == "done":
+        status["url"] = download_url(status["key"])
+        status["urlExpiresIn"] = EXPORT_URL_TTL_SECONDS
+    return response(200, status)
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+
+from src.common.auth import authenticated
+from src.common.exports import EXPORT_FORMATS, archive_horizon, save_status
+from src.common.metrics import instrumented
+from src.common.utils import get_tenant_from_event, new_sortable_id, now_iso, publish_event, response
+
+
+@instrumented
+@authenticated
+def handler(event, _context):
+    """
+    Ask for an export of the tenant's orders created in [from, to) (ISO
+    dates or timestamps, UTC; yesterday by default) as `ndjson` or `csv`.
+    The file is written by the export worker; poll `GET /exports/{exportId}`
+    for its status and download link. Ranges starting before the archive
+    horizon (ARCHIVE_AFTER_DAYS) are refused: those orders may be in the
+    archive only, which exports do not read.
+    """
+    tenant_id = get_tenant_from_event(event)
+    if not tenant_id:
+        return response(400, {"message": "tenantId es requerido"})
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        return response(400, {"message": "Body inválido"})
+
+    export_format = body.get("format") or "ndjson"
+    if export_format not in EXPORT_FORMATS:
+        return response(400, {"message": f"format debe ser uno de {', '.join(EXPORT_FORMATS)}"})
+    today = datetime.combine(datetime.now(timezone.utc).date(), time(), timezone.utc)
+    try:
+        start = _parse_moment(body["from"]) if body.get("from") else today - timedelta(days=1)
+        end = _parse_moment(body["to"]) if body.get("to") else start + timedelta(days=1)
+    except ValueError:
+        return response(400, {"message": "from/to deben ser fechas ISO"})
+    if end <= start:
+        return response(400, {"message": "to debe ser posterior a from"})
+    horizon = archive_horizon()
+    if start < horizon:
+        return response(
+            400,
+            {
+                "message": f"from no puede ser anterior a {horizon.isoformat()}: esos pedidos pueden estar archivados",
+                "archivedBefore": horizon.isoformat(),
+            },
+        )
+
+    status = {
+        "exportId": new_sortable_id("export"),
+        "tenantId": tenant_id,
+        "format": export_format,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "status": "pending",
+        "requestedAt": now_iso(),
+    }
+    save_status(status)
+    publish_event(
+        "export.requested",
+        {"tenantId": tenant_id, "exportId": status["exportId"]},
+        source="kfc.exports",
+    )
+    return response(202, status)
+
+
+def _parse_moment(value: str) -> datetime:
+    # createdAt is stored in UTC and compared as a string: bounds must be UTC too.
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
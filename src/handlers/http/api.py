@@ -0,0 +1,72 @@
+import importlib
+import re
+
+from src.common.utils import response
+
+# API Gateway routeKey -> handler module. Mirrors serverless/http-split.yml,
+# so the same routes work with one function per route or with this one.
+ROUTES = {
+    "POST /tenants": "src.handlers.tenants.register",
+    "POST /tenants/{tenantId}/orders": "src.handlers.orders.create_order",
+    "GET /tenants/{tenantId}/orders": "src.handlers.orders.list_orders",
+    "GET /tenants/{tenantId}/orders/changes": "src.handlers.orders.list_changes",
+    "GET /tenants/{tenantId}/orders/{orderId}": "src.handlers.orders.get_order",
+    "POST /tenants/{tenantId}/orders/{orderId}/stages/{stage}/complete": "src.handlers.orders.complete_stage",
+    "POST /tenants/{tenantId}/orders/stages/{stage}/complete": "src.handlers.orders.complete_stages",
+    "GET /tenants/{tenantId}/stats": "src.handlers.stats.get_stats",
+    "POST /tenants/{tenantId}/products": "src.handlers.products.create_product",
+    "GET /tenants/{tenantId}/products": "src.handlers.products.list_products",
+    "POST /tenants/{tenantId}/auth/register": "src.handlers.auth.register_user",
+    "POST /tenants/{tenantId}/auth/login": "src.handlers.auth.login",
+    "POST /tenants/{tenantId}/exports": "src.handlers.exports.request_export",
+    "GET /tenants/{tenantId}/exports/{exportId}": "src.handlers.exports.get_export",
+}
+
+# routeKey -> handler function, imported on first use.
+_handlers: dict = {}
+
+
+def _compile(route_key: str):
+    method, path = route_key.split(" ", 1)
+    pattern = re.sub(r"\\{(\w+)\\}", r"(?P<\1>[^/]+)", re.escape(path))
+    return method, re.compile(f"^{pattern}$"), route_key
+
+
+# For requests without a matching routeKey (e.g. a `$default` route). Fewer
+# parameters first, so `/orders/changes` wins over `/orders/{orderId}`.
+_PATTERNS = [_compile(key) for key in sorted(ROUTES, key=lambda key: key.count("{"))]
+
+
+def handler(event, context):
+    """
+    Single entry point for every HTTP route (HTTP_ROUTER=single). Dispatches
+    on the request's routeKey to the route's own handler, so a warm container
+    serves all routes; handler modules are imported the first time their
+    route is hit. Per-route metrics still come from each handler.
+    """
+    route_key = event.get("routeKey")
+    if route_key not in ROUTES:
+        route_key, path_parameters = match(event)
+        if route_key is None:
+            return response(404, {"message": "Ruta no encontrada"})
+        event = {**event, "pathParameters": path_parameters}
+    return route_handler(route_key)(event, context)
+
+
+def match(event) -> tuple[str | None, dict]:
+    """routeKey and path parameters for the request's method and path."""
+    http = (event.get("requestContext") or {}).get("http") or {}
+    method = (http.get("method") or event.get("httpMethod") or "").upper()
+    path = event.get("rawPath") or event.get("path") or ""
+    for route_method, pattern, route_key in _PATTERNS:
+        found = pattern.match(path) if route_method == method else None
+        if found:
+            return route_key, found.groupdict()
+    return None, {}
+
+
+def route_handler(route_key: str):
+    fn = _handlers.get(route_key)
+    if fn is None:
+        fn = _handlers[route_key] = importlib.import_module(ROUTES[route_key]).handler
+    return fn
@@ -0,0 +1,99 @@
+import itertools
+import os
+from datetime import datetime, timedelta, timezone
+
+from boto3.dynamodb.conditions import Attr, Key
+
+from src.common.archive import ARCHIVE_AFTER_DAYS, LEGACY_MANIFEST, add_to_manifest, manifest_name, write_batch
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import BATCH_GET_MAX_KEYS, batch_get_items, get_table, query_all, scan_tenant_ids
+
+ARCHIVE_BATCH_MAX_ORDERS = int(os.environ.get("ARCHIVE_BATCH_MAX_ORDERS", "1000"))
+# Bounds one run per tenant; the rest is picked up by the next run.
+ARCHIVE_MAX_ORDERS_PER_TENANT = int(os.environ.get("ARCHIVE_MAX_ORDERS_PER_TENANT", "20000"))
+FINAL_STATUSES = ("delivered",)
+
+logger = get_logger(__name__)
+
+
+@instrumented
+def handler(event, _context):
+    """
+    Scheduled job: moves orders in a final status not updated for
+    ARCHIVE_AFTER_DAYS to the media bucket (see src/common/archive.py) and
+    deletes them from the orders table. `{"tenantId", "olderThanDays"}` in
+    the event narrows a manual run.
+    """
+    event = event or {}
+    days = int(event.get("olderThanDays", ARCHIVE_AFTER_DAYS))
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    tenant_ids = [event["tenantId"]] if event.get("tenantId") else scan_tenant_ids()
+
+    table = get_table("ORDERS_TABLE")
+    totals = {"tenants": 0, "orders": 0, "batches": 0, "bytes": 0}
+    for tenant_id in tenant_ids:
+        archived = archive_tenant(table, tenant_id, cutoff)
+        if archived["orders"]:
+            totals["tenants"] += 1
+            for name in ("orders", "batches", "bytes"):
+                totals[name] += archived[name]
+    logger.info("archived %s", totals)
+    return totals
+
+
+def archive_tenant(table, tenant_id: str, cutoff: str) -> dict:
+    # (manifest, partition date) -> orders. Sortable ids are filed under
+    # their own day; legacy ones under the legacy manifest and createdAt.
+    groups: dict[tuple[str, str], list] = {}
+    for order in itertools.islice(_final_orders(table, tenant_id, cutoff), ARCHIVE_MAX_ORDERS_PER_TENANT):
+        name = manifest_name(order["orderId"]) or LEGACY_MANIFEST
+        date = (order.get("createdAt") or order["updatedAt"])[:10] if name == LEGACY_MANIFEST else name
+        groups.setdefault((name, date), []).append(order)
+    if not groups:
+        return {"orders": 0, "batches": 0, "bytes": 0}
+
+    entries: dict[str, list] = {}
+    for (name, date), orders in sorted(groups.items()):
+        for start in range(0, len(orders), ARCHIVE_BATCH_MAX_ORDERS):
+            entries.setdefault(name, []).append(
+                write_batch(tenant_id, date, orders[start : start + ARCHIVE_BATCH_MAX_ORDERS])
+            )
+    for name, manifest_entries in entries.items():
+        add_to_manifest(tenant_id, name, manifest_entries)
+
+    # Only once the manifests point at the batches are the hot copies dropped
+    # (BatchWriteItem, 25 deletes per call).
+    with table.batch_writer() as batch:
+        for orders in groups.values():
+            for order in orders:
+                batch.delete_item(Key={"tenantId": tenant_id, "orderId": order["orderId"]})
+    entries = [entry for manifest_entries in entries.values() for entry in manifest_entries]
+    return {
+        "orders": sum(entry["count"] for entry in entries),
+        "batches": len(entries),
+        "bytes": sum(entry["bytes"] for entry in entries),
+    }
+
+
+def _final_orders(table, tenant_id: str, cutoff: str):
+    """
+    Orders in a final status last updated before `cutoff`. updated-index reads
+    only the orders past the cutoff (status is projected there); the full
+    items come from the table with BatchGetItem.
+    """
+    keys = []
+    for item in query_all(
+        table,
+        IndexName="updated-index",
+        KeyConditionExpression=Key("tenantId").eq(tenant_id) & Key("updatedAt").lt(cutoff),
+        FilterExpression=Attr("status").is_in(list(FINAL_STATUSES)),
+        ProjectionExpression="orderId",
+    ):
+        keys.append({"tenantId": tenant_id, "orderId": item["orderId"]})
+        if len(keys) == BATCH_GET_MAX_KEYS:
+            yield from batch_get_items(table, keys)
+            keys = []
+    if keys:
+        yield from batch_get_items(table, keys)
+
@@ -2,7 +2,10 @@ import json
 
 from botocore.exceptions import ClientError
 
-from src.common.utils import get_table, now_iso, publish_event, response, sfn
+from src.common.auth import authenticated
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import get_client, get_table, now_iso, publish_event, response
 
 
 STAGE_DONE_STATUS = {
@@ -11,7 +14,11 @@ STAGE_DONE_STATUS = {
     "delivery": "delivered",
 }
 
+logger = get_logger(__name__)
 
+
+@instrumented
+@authenticated
 def handler(event, _context):
     path = event.get("pathParameters") or {}
     tenant_id = path.get("tenantId")
@@ -27,34 +34,11 @@ def handler(event, _context):
 
     done_status = STAGE_DONE_STATUS[stage]
     now = now_iso()
-    actor = _get_actor(event)
+    actor = get_actor(event)
     table = get_table("ORDERS_TABLE")
 
     try:
-        update_result = table.update_item(
-            Key={"tenantId": tenant_id, "orderId": order_id},
-            UpdateExpression=(
-                "SET #status = :doneStatus, "
-                "workflow.#stage.#stageStatus = :stageDone, "
-                "workflow.#stage.completedAt = :now, "
-                "workflow.#stage.actor = :actor, "
-                "updatedAt = :now "
-                "REMOVE workflow.#stage.taskToken"
-            ),
-            ConditionExpression="attribute_exists(workflow.#stage.taskToken)",
-            ExpressionAttributeNames={
-                "#status": "status",
-                "#stage": stage,
-                "#stageStatus": "status",
-            },
-            ExpressionAttributeValues={
-                ":doneStatus": done_status,
-                ":stageDone": "completed",
-                ":now": now,
-                ":actor": actor,
-            },
-            ReturnValues="ALL_OLD",
-        )
+        token = mark_stage_completed(table, tenant_id, order_id, stage, actor, now)
     except ClientError as exc:
         if exc.response["Error"]["Code"] == "ConditionalCheckFailedException":
             return response(
@@ -62,40 +46,87 @@ def handler(event, _context):
             )
         raise
 
-    attrs = update_result.get("Attributes", {}) or {}
-    token = attrs.get("workflow", {}).get(stage, {}).get("taskToken")
-
     if not token:
         return response(500, {"message": "No se encontró taskToken para el stage"})
 
-    publish_event(
-        "order.stage.completed",
-        {
-            "tenantId": tenant_id,
-            "orderId": order_id,
-            "stage": stage,
-            "status": done_status,
-            "completedAt": now,
-            "actor": actor,
+    # The token is gone from the order once the stage is completed: resume the
+    # workflow before anything else can fail.
+    send_stage_success(token, tenant_id, order_id, stage, now)
+
+    result = {"orderId": order_id, "stage": stage, "status": done_status}
+    try:
+        publish_event("order.stage.completed", stage_completed_detail(tenant_id, order_id, stage, actor, now))
+    except Exception as exc:  # noqa: BLE001 - the stage is completed either way
+        logger.error("[%s] failed to publish order.stage.completed for %s: %r", stage, order_id, exc)
+        result["eventPublished"] = False
+
+    return response(200, result)
+
+
+def mark_stage_completed(table, tenant_id: str, order_id: str, stage: str, actor: str, now: str):
+    """
+    Complete `stage` on the order and return the task token it held. Raises
+    ConditionalCheckFailedException when the stage has no pending task. Uses
+    the table's low-level client, so it is safe to call from worker threads.
+    """
+    update_result = table.meta.client.update_item(
+        TableName=table.name,
+        Key={"tenantId": tenant_id, "orderId": order_id},
+        UpdateExpression=(
+            "SET #status = :doneStatus, "
+            "workflow.#stage.#stageStatus = :stageDone, "
+            "workflow.#stage.completedAt = :now, "
+            "workflow.#stage.actor = :actor, "
+            "updatedAt = :now "
+            "REMOVE workflow.#stage.taskToken"
+        ),
+        ConditionExpression="attribute_exists(workflow.#stage.taskToken)",
+        ExpressionAttributeNames={
+            "#status": "status",
+            "#stage": stage,
+            "#stageStatus": "status",
         },
+        ExpressionAttributeValues={
+            ":doneStatus": STAGE_DONE_STATUS[stage],
+            ":stageDone": "completed",
+            ":now": now,
+            ":actor": actor,
+        },
+        ReturnValues="ALL_OLD",
     )
+    attrs = update_result.get("Attributes", {}) or {}
+    return attrs.get("workflow", {}).get(stage, {}).get("taskToken")
+
 
-    sfn.send_task_success(
+def stage_completed_detail(tenant_id: str, order_id: str, stage: str, actor: str, now: str) -> dict:
+    return {
+        "tenantId": tenant_id,
+        "orderId": order_id,
+        "stage": stage,
+        "status": STAGE_DONE_STATUS[stage],
+        "completedAt": now,
+        "actor": actor,
+    }
+
+
+def send_stage_success(token: str, tenant_id: str, order_id: str, stage: str, now: str):
+    get_client("stepfunctions").send_task_success(
         taskToken=token,
         output=json.dumps(
             {
                 "tenantId": tenant_id,
                 "orderId": order_id,
                 "stage": stage,
-                "status": done_status,
+                "status": STAGE_DONE_STATUS[stage],
                 "completedAt": now,
             }
         ),
     )
 
-    return response(200, {"orderId": order_id, "stage": stage, "status": done_status})
-
 
-def _get_actor(event):
+def get_actor(event):
+    claims = event.get("auth") or {}
+    if claims.get("sub"):
+        return claims["sub"]
     headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
     return headers.get("x-user-id") or headers.get("x-role") or "operator"
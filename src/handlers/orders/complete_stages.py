@@ -0,0 +1,127 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from src.common.auth import authenticated
+from src.common.logs import get_logger
+from src.common.metrics import instrumented
+from src.common.utils import EventPublisher, EventPublishError, get_table, now_iso, response
+from src.handlers.orders.complete_stage import (
+    STAGE_DONE_STATUS,
+    get_actor,
+    mark_stage_completed,
+    send_stage_success,
+    stage_completed_detail,
+)
+
+BULK_COMPLETE_MAX_ORDERS = int(os.environ.get("BULK_COMPLETE_MAX_ORDERS", "50"))
+BULK_COMPLETE_CONCURRENCY = int(os.environ.get("BULK_COMPLETE_CONCURRENCY", "10"))
+
+logger = get_logger(__name__)
+
+
+@instrumented
+@authenticated
+def handler(event, _context):
+    """
+    Complete one stage for several orders: `{"orderIds": [...]}`. The order
+    updates and the Step Functions callbacks run concurrently and the
+    `order.stage.completed` events go out in one batch, so a rack of orders
+    costs about as much as a single completion. Returns a result per order;
+    `eventPublished: false` flags a completed order whose event could not be
+    published (the task token is already consumed, so it is not retried).
+    """
+    path = event.get("pathParameters") or {}
+    tenant_id = path.get("tenantId")
+    stage = (path.get("stage") or "").lower()
+    if not tenant_id or not stage:
+        return response(400, {"message": "tenantId y stage son requeridos"})
+    if stage not in STAGE_DONE_STATUS:
+        return response(400, {"message": "stage invalido"})
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        return response(400, {"message": "JSON inválido"})
+
+    order_ids = body.get("orderIds")
+    if not isinstance(order_ids, list) or not order_ids or not all(isinstance(o, str) and o for o in order_ids):
+        return response(400, {"message": "orderIds debe ser una lista de ids"})
+    order_ids = list(dict.fromkeys(order_ids))
+    if len(order_ids) > BULK_COMPLETE_MAX_ORDERS:
+        return response(400, {"message": f"Máximo {BULK_COMPLETE_MAX_ORDERS} pedidos por llamada"})
+
+    done_status = STAGE_DONE_STATUS[stage]
+    now = now_iso()
+    actor = get_actor(event)
+    table = get_table("ORDERS_TABLE")
+    results = {}
+    tokens = {}
+
+    workers = min(len(order_ids), BULK_COMPLETE_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(mark_stage_completed, table, tenant_id, order_id, stage, actor, now)
+            for order_id in order_ids
+        ]
+    for order_id, future in zip(order_ids, futures):
+        error = future.exception()
+        if isinstance(error, ClientError) and error.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            results[order_id] = _failure(order_id, 409, "No hay tarea pendiente para este stage")
+        elif error is not None:
+            logger.error("[%s] failed to complete %s: %r", stage, order_id, error)
+            results[order_id] = _failure(order_id, 500, "Error al completar el stage")
+        elif not future.result():
+            results[order_id] = _failure(order_id, 500, "No se encontró taskToken para el stage")
+        else:
+            tokens[order_id] = future.result()
+
+    if tokens:
+        # The tokens were removed with the stage update: resume the workflows
+        # first, whatever happens to the events.
+        with ThreadPoolExecutor(max_workers=min(len(tokens), BULK_COMPLETE_CONCURRENCY)) as pool:
+            futures = {
+                order_id: pool.submit(send_stage_success, token, tenant_id, order_id, stage, now)
+                for order_id, token in tokens.items()
+            }
+        for order_id, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.error("[%s] failed to resume workflow for %s: %r", stage, order_id, error)
+                results[order_id] = _failure(order_id, 502, "No se pudo avanzar el workflow")
+            else:
+                results[order_id] = {"orderId": order_id, "statusCode": 200, "status": done_status}
+
+        for order_id in _publish_completed(tenant_id, list(tokens), stage, actor, now):
+            results[order_id]["eventPublished"] = False
+
+    ordered = [results[order_id] for order_id in order_ids]
+    completed = sum(1 for result in ordered if result["statusCode"] == 200)
+    return response(
+        200,
+        {"stage": stage, "completed": completed, "failed": len(ordered) - completed, "results": ordered},
+    )
+
+
+def _publish_completed(tenant_id: str, order_ids: list, stage: str, actor: str, now: str) -> list:
+    """Publish order.stage.completed for `order_ids`; returns the ids whose event did not go out."""
+    events = EventPublisher()
+    entries = {}
+    for order_id in order_ids:
+        entry = events.add("order.stage.completed", stage_completed_detail(tenant_id, order_id, stage, actor, now))
+        entries[id(entry)] = order_id
+    try:
+        events.flush()
+    except EventPublishError as exc:
+        logger.error("[%s] %s", stage, exc)
+        return [entries[id(entry)] for entry in exc.entries]
+    except Exception as exc:  # noqa: BLE001 - the stages are completed either way
+        logger.error("[%s] failed to publish stage events: %r", stage, exc)
+        return order_ids
+    return []
+
+
+def _failure(order_id: str, status: int, message: str) -> dict:
+    return {"orderId": order_id, "statusCode": status, "message": message}
@@ -1,10 +1,24 @@
 import json
 from decimal import Decimal
 
+from src.common.auth import authenticated
+from src.common.catalog import get_products
+from src.common.idempotency import (
+    MAX_KEY_LENGTH,
+    get_idempotency_key,
+    lookup,
+    mark_published,
+    record_write,
+    replay,
+    request_hash,
+)
+from src.common.inventory import StockConflict, StockUnavailable, WriteRejected, is_shard, reserve_stock
+from src.common.metrics import instrumented
 from src.common.utils import (
+    json_dumps,
     get_table,
     get_tenant_from_event,
-    new_id,
+    new_sortable_id,
     now_iso,
     publish_event,
     response,
@@ -12,6 +26,8 @@ from src.common.utils import (
 )
 
 
+@instrumented
+@authenticated
 def handler(event, _context):
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
@@ -22,6 +38,16 @@ def handler(event, _context):
     except json.JSONDecodeError:
         return response(400, {"message": "Invalid JSON body"})
 
+    # A retried request replays the stored response instead of re-running the pipeline.
+    idempotency_key = get_idempotency_key(event)
+    if idempotency_key:
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return response(400, {"message": f"Idempotency-Key admite hasta {MAX_KEY_LENGTH} caracteres"})
+        fingerprint = request_hash(body)
+        record = lookup(tenant_id, idempotency_key)
+        if record:
+            return _replay(tenant_id, idempotency_key, record, fingerprint)
+
     items = body.get("items") or []
     customer = body.get("customer") or {}
     notes = body.get("notes")
@@ -31,7 +57,7 @@ def handler(event, _context):
     if not customer.get("name"):
         return response(400, {"message": "customer.name is required"})
 
-    order_id = new_id("order")
+    order_id = new_sortable_id("order")
     now = now_iso()
     workflow = {
         "kitchen": {"status": "pending"},
@@ -39,21 +65,22 @@ def handler(event, _context):
         "delivery": {"status": "pending"},
     }
 
-    products_table = get_table("PRODUCTS_TABLE")
-    enriched_items = []
-    updates = []
+    quantities = {}
     for item in items:
         product_id = item.get("productId")
         qty = int(item.get("quantity") or 0)
         if not product_id or qty <= 0:
             return response(400, {"message": "Cada item requiere productId y quantity > 0"})
-        prod = products_table.get_item(Key={"tenantId": tenant_id, "productId": product_id}).get(
-            "Item"
-        )
+        quantities[product_id] = quantities.get(product_id, 0) + qty
+
+    products = get_products(tenant_id, list(quantities))
+    enriched_items = []
+    for item in items:
+        product_id = item["productId"]
+        qty = int(item["quantity"])
+        prod = None if is_shard(product_id) else products.get(product_id)
         if not prod:
             return response(404, {"message": f"Producto {product_id} no encontrado"})
-        if prod.get("stock", 0) < qty:
-            return response(400, {"message": f"Stock insuficiente para {prod.get('name')}"})
         price = float(prod.get("price", 0))
         enriched_items.append(
             {
@@ -64,31 +91,6 @@ def handler(event, _context):
                 "lineTotal": round(price * qty, 2),
             }
         )
-        updates.append(
-            {
-                "Key": {"tenantId": tenant_id, "productId": product_id},
-                "UpdateExpression": "SET stock = stock - :q",
-                "ConditionExpression": "stock >= :q",
-                "ExpressionAttributeValues": {":q": qty},
-            }
-        )
-
-    # Decrement stock atomically
-    client = products_table.meta.client
-    transact_items = [
-        {
-            "Update": {
-                "TableName": products_table.name,
-                "Key": to_decimal(u["Key"]),
-                "UpdateExpression": u["UpdateExpression"],
-                "ConditionExpression": u["ConditionExpression"],
-                "ExpressionAttributeValues": to_decimal(u["ExpressionAttributeValues"]),
-            }
-        }
-        for u in updates
-    ]
-    if transact_items:
-        client.transact_write_items(TransactItems=transact_items)
 
     total_amount = sum([item["lineTotal"] for item in enriched_items])
     order_item = {
@@ -103,20 +105,61 @@ def handler(event, _context):
         "createdAt": now,
         "updatedAt": now,
     }
+    result = {"orderId": order_id, "status": "placed", "workflow": workflow}
+    result_body = json_dumps(result)
+    created = {
+        "orderId": order_id,
+        "tenantId": tenant_id,
+        "status": "placed",
+        "createdAt": now,
+        "totalAmount": total_amount,
+        "workflow": workflow,
+        "customer": customer,
+    }
+
+    # Stock decrement, order and idempotency record commit in one transaction;
+    # its conditions are the authoritative stock check. order.created goes out
+    # after the commit, so the record keeps it until it is published.
+    writes = [{"Put": {"TableName": get_table("ORDERS_TABLE").name, "Item": to_decimal(order_item)}}]
+    if idempotency_key:
+        writes.append(
+            record_write(
+                tenant_id,
+                idempotency_key,
+                fingerprint,
+                201,
+                result_body,
+                orderId=order_id,
+                published=False,
+                event=json_dumps(created),
+            )
+        )
+    try:
+        reserve_stock(get_table("PRODUCTS_TABLE"), tenant_id, quantities, products, writes)
+    except StockUnavailable as exc:
+        name = products[exc.product_id].get("name")
+        return response(400, {"message": f"Stock insuficiente para {name}"})
+    except StockConflict:
+        return response(409, {"message": "Conflicto al reservar stock, reintente"})
+    except WriteRejected:
+        # A concurrent retry with the same key committed first.
+        record = lookup(tenant_id, idempotency_key)
+        if record:
+            return _replay(tenant_id, idempotency_key, record, fingerprint)
+        return response(409, {"message": "Conflicto al reservar stock, reintente"})
+
+    publish_event("order.created", created)
+    if idempotency_key:
+        mark_published(tenant_id, idempotency_key)
+
+    return response(201, result_body)
+
 
-    orders_table = get_table("ORDERS_TABLE")
-    orders_table.put_item(Item=to_decimal(order_item))
-
-    publish_event(
-        "order.created",
-        {
-            "orderId": order_id,
-            "tenantId": tenant_id,
-            "status": "placed",
-            "createdAt": now,
-            "workflow": workflow,
-            "customer": customer,
-        },
-    )
-
-    return response(201, {"orderId": order_id, "status": "placed", "workflow": workflow})
+def _replay(tenant_id: str, idempotency_key: str, record: dict, fingerprint: str):
+    # The first attempt committed the order but failed before order.created
+    # went out (or before it was recorded): publish it now. Records without
+    # the flag predate it and were published.
+    if record.get("published") is False and record.get("requestHash") == fingerprint:
+        publish_event("order.created", json.loads(record["event"]))
+        mark_published(tenant_id, idempotency_key)
+    return replay(record, fingerprint)
@@ -1,6 +1,11 @@
+from src.common.archive import find_archived_order
+from src.common.auth import authenticated
+from src.common.metrics import instrumented
 from src.common.utils import get_table, response
 
 
+@instrumented
+@authenticated
 def handler(event, _context):
     path_params = event.get("pathParameters") or {}
     tenant_id = path_params.get("tenantId")
@@ -13,7 +18,11 @@ def handler(event, _context):
     result = table.get_item(Key={"tenantId": tenant_id, "orderId": order_id})
     item = result.get("Item")
     if not item:
-        return response(404, {"message": "Order not found"})
+        # Delivered orders move to the archive after ARCHIVE_AFTER_DAYS.
+        archived = find_archived_order(tenant_id, order_id)
+        if not archived:
+            return response(404, {"message": "Order not found"})
+        item = {**archived, "archived": True}
 
     return response(200, item)
 
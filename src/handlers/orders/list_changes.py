@@ -0,0 +1,113 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from boto3.dynamodb.conditions import Key
+
+from src.common.auth import authenticated
+from src.common.metrics import instrumented
+from src.common.utils import (
+    decode_cursor,
+    encode_cursor,
+    get_table,
+    get_tenant_from_event,
+    response,
+)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = int(os.environ.get("ORDER_CHANGES_MAX_LIMIT", "500"))
+# Older cursors get a resync signal: a full reload is cheaper than the backlog.
+MAX_CURSOR_AGE = timedelta(seconds=int(os.environ.get("ORDER_CHANGES_MAX_AGE_SECONDS", "3600")))
+# updated-index is eventually consistent and updatedAt comes from many
+# containers' clocks: a change stamped before the last one served can still
+# show up later. Only changes older than this are served, so none is skipped.
+SETTLE_DELAY = timedelta(milliseconds=int(os.environ.get("ORDER_CHANGES_SETTLE_MS", "2000")))
+
+
+@instrumented
+@authenticated
+def handler(event, _context):
+    """
+    Delta sync for screens: orders whose `updatedAt` is past the `since`
+    cursor, oldest first, as compact change records read from `updated-index`.
+    Changes younger than ORDER_CHANGES_SETTLE_MS wait for a later poll.
+    Without a cursor, or with one older than ORDER_CHANGES_MAX_AGE_SECONDS,
+    the response carries `resync: true` and a fresh cursor: the client reloads
+    with `GET /orders` and continues from that cursor.
+    """
+    tenant_id = get_tenant_from_event(event)
+    if not tenant_id:
+        return response(400, {"message": "tenantId is required"})
+
+    params = event.get("queryStringParameters") or {}
+    try:
+        limit = min(int(params.get("limit") or DEFAULT_LIMIT), MAX_LIMIT)
+    except ValueError:
+        return response(400, {"message": "limit must be an integer"})
+    if limit <= 0:
+        return response(400, {"message": "limit must be > 0"})
+
+    if not params.get("since"):
+        return _resync(tenant_id)
+    position = decode_cursor(params["since"])
+    if not position or position.get("tenantId") != tenant_id or not isinstance(position.get("updatedAt"), str):
+        return response(400, {"message": "Invalid since cursor"})
+    try:
+        issued = datetime.fromisoformat(position["updatedAt"])
+    except ValueError:
+        return response(400, {"message": "Invalid since cursor"})
+    now = datetime.now(timezone.utc)
+    if issued < now - MAX_CURSOR_AGE:
+        return _resync(tenant_id)
+    horizon = (now - SETTLE_DELAY).isoformat()
+    if position["updatedAt"] > horizon:
+        return response(200, {"changes": [], "cursor": params["since"], "hasMore": False, "resync": False})
+
+    # Bounds are inclusive: a change at the cursor's own timestamp is served
+    # again, which is harmless for a delta sync.
+    key_condition = Key("tenantId").eq(tenant_id) & Key("updatedAt").between(position["updatedAt"], horizon)
+    query = {
+        "IndexName": "updated-index",
+        "Limit": limit,
+        "ScanIndexForward": True,
+        "ProjectionExpression": "orderId, #status, updatedAt, workflow",
+        "ExpressionAttributeNames": {"#status": "status"},
+    }
+    if position.get("orderId"):
+        # Resume right after the last change delivered.
+        query["ExclusiveStartKey"] = {
+            "tenantId": tenant_id,
+            "orderId": position["orderId"],
+            "updatedAt": position["updatedAt"],
+        }
+
+    result = get_table("ORDERS_TABLE").query(KeyConditionExpression=key_condition, **query)
+    changes = [_change_record(item) for item in result.get("Items", [])]
+    if changes:
+        last = changes[-1]
+        position = {"tenantId": tenant_id, "updatedAt": last["updatedAt"], "orderId": last["orderId"]}
+
+    return response(
+        200,
+        {
+            "changes": changes,
+            "cursor": encode_cursor(position),
+            "hasMore": "LastEvaluatedKey" in result,
+            "resync": False,
+        },
+    )
+
+
+def _change_record(item: dict) -> dict:
+    return {
+        "orderId": item["orderId"],
+        "status": item.get("status"),
+        "updatedAt": item["updatedAt"],
+        "stages": {stage: info.get("status") for stage, info in (item.get("workflow") or {}).items()},
+    }
+
+
+def _resync(tenant_id: str):
+    # Start before the settle window: the reload may not see its changes yet.
+    since = (datetime.now(timezone.utc) - SETTLE_DELAY).isoformat()
+    cursor = encode_cursor({"tenantId": tenant_id, "updatedAt": since})
+    return response(200, {"changes": [], "cursor": cursor, "hasMore": False, "resync": True})
@@ -1,8 +1,39 @@
-from boto3.dynamodb.conditions import Key
+import os
+from datetime import datetime, timedelta, timezone
 
-from src.common.utils import get_table, get_tenant_from_event, response
+from boto3.dynamodb.conditions import Attr, Key
 
+from src.common.auth import authenticated
+from src.common.metrics import instrumented
+from src.common.utils import (
+    decode_cursor,
+    encode_cursor,
+    get_table,
+    get_tenant_from_event,
+    order_ids_sortable_since,
+    order_window_query,
+    response,
+    sortable_id_bound,
+)
 
+DEFAULT_LIMIT = 50
+MAX_LIMIT = int(os.environ.get("LIST_ORDERS_MAX_LIMIT", "100"))
+ORDER_FIELDS = {
+    "tenantId",
+    "orderId",
+    "status",
+    "items",
+    "customer",
+    "notes",
+    "totalAmount",
+    "workflow",
+    "createdAt",
+    "updatedAt",
+}
+
+
+@instrumented
+@authenticated
 def handler(event, _context):
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
@@ -10,23 +41,131 @@ def handler(event, _context):
 
     params = event.get("queryStringParameters") or {}
     status = params.get("status") if params else None
-    limit = int(params.get("limit") or 50)
+    try:
+        limit = min(int(params.get("limit") or DEFAULT_LIMIT), MAX_LIMIT)
+    except ValueError:
+        return response(400, {"message": "limit must be an integer"})
+    if limit <= 0:
+        return response(400, {"message": "limit must be > 0"})
+
+    try:
+        since = _parse_time(params.get("since"))
+        until = _parse_time(params.get("until"))
+    except ValueError:
+        return response(400, {"message": "since/until must be ISO-8601 timestamps from 1970 on"})
+
+    query = {"Limit": limit, "ScanIndexForward": False}
+
+    # A cursor only continues the query it came from: another index or filter
+    # would not accept its key (or would skip items).
+    scope = {
+        "index": "status-index" if status else "table",
+        "status": status,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+    }
+    phase = 0
+    if params.get("nextToken"):
+        start_key = decode_cursor(params["nextToken"], scope)
+        if not start_key or start_key.get("tenantId") != tenant_id:
+            return response(400, {"message": "Invalid nextToken"})
+        phase = start_key.pop("phase", 0)
+        if "orderId" in start_key:
+            query["ExclusiveStartKey"] = start_key
+
+    if params.get("fields"):
+        fields = [f.strip() for f in params["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in ORDER_FIELDS]
+        if unknown:
+            return response(400, {"message": f"Unknown fields: {', '.join(unknown)}"})
+        names = {f"#f{i}": field for i, field in enumerate(fields)}
+        query["ProjectionExpression"] = ", ".join(names)
+        query["ExpressionAttributeNames"] = names
 
     table = get_table("ORDERS_TABLE")
     if status:
-        result = table.query(
+        if since or until:
+            # status-index is sorted by status, so the time window is a filter here.
+            query["FilterExpression"] = Attr("createdAt").between(
+                (since or datetime.min.replace(tzinfo=timezone.utc)).isoformat(),
+                (until or datetime.now(timezone.utc)).isoformat(),
+            )
+        items, next_key = _page(
+            table,
             IndexName="status-index",
             KeyConditionExpression=Key("tenantId").eq(tenant_id)
             & Key("status").begins_with(status),
-            Limit=limit,
-            ScanIndexForward=False,
+            **query,
         )
-    else:
-        result = table.query(
-            KeyConditionExpression=Key("tenantId").eq(tenant_id),
-            Limit=limit,
-            ScanIndexForward=False,
+    elif since or until:
+        items, next_key = _page(
+            table,
+            **order_window_query(
+                tenant_id,
+                since or datetime.fromtimestamp(0, timezone.utc),
+                until or datetime.now(timezone.utc),
+            ),
+            **query,
         )
+    else:
+        items, next_key = _newest_first(table, tenant_id, query, phase)
+
+    for item in items:
+        # Task tokens are internal to the workflow; never hand them to clients.
+        for stage in (item.get("workflow") or {}).values():
+            stage.pop("taskToken", None)
+
+    body = {"items": items}
+    if next_key:
+        body["nextToken"] = encode_cursor(next_key, scope)
+    return response(200, body)
+
+
+def _page(table, **query) -> tuple[list, dict | None]:
+    result = table.query(**query)
+    return result.get("Items", []), result.get("LastEvaluatedKey")
+
+
+def _newest_first(table, tenant_id: str, query: dict, phase: int) -> tuple[list, dict | None]:
+    """
+    The plain listing. Legacy `order_<hex12>` ids (before
+    ORDER_IDS_SORTABLE_SINCE) sort anywhere, mostly ahead of sortable ids, so
+    with a cutover set the sortable range is listed first, newest first, and
+    the legacy ids after it, in id order. The cursor keeps the range (phase)
+    it stopped in. Without a cutover the partition is listed in id order.
+    """
+    tenant = Key("tenantId").eq(tenant_id)
+    sortable_since = order_ids_sortable_since()
+    if sortable_since is None:
+        return _page(table, KeyConditionExpression=tenant, **query)
+
+    lower = sortable_id_bound("order", sortable_since)
+    upper = sortable_id_bound("order", datetime.now(timezone.utc) + timedelta(days=1), upper=True)
+    ranges = (
+        tenant & Key("orderId").between(lower, upper),
+        tenant & Key("orderId").gt(upper),
+        tenant & Key("orderId").lt(lower),
+    )
+    items, limit = [], query["Limit"]
+    while phase < len(ranges):
+        page, last_key = _page(table, KeyConditionExpression=ranges[phase], **{**query, "Limit": limit - len(items)})
+        items.extend(page)
+        if last_key:
+            return items, {**last_key, "phase": phase}
+        query.pop("ExclusiveStartKey", None)
+        phase += 1
+        if len(items) == limit and phase < len(ranges):
+            return items, {"tenantId": tenant_id, "phase": phase}
+    return items, None
 
-    return response(200, {"items": result.get("Items", [])})
 
+def _parse_time(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    if moment.timestamp() < 0:
+        raise ValueError("before the epoch")
+    return moment
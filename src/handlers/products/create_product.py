@@ -1,8 +1,14 @@
 import json
 
+from src.common.auth import authenticated
+from src.common.catalog import bump_catalog_version
+from src.common.inventory import MAX_STOCK_SHARDS, shard_items
+from src.common.metrics import instrumented
 from src.common.utils import get_table, new_id, now_iso, response, to_decimal, get_tenant_from_event
 
 
+@instrumented
+@authenticated
 def handler(event, _context):
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
@@ -17,6 +23,7 @@ def handler(event, _context):
     price = body.get("price")
     stock = body.get("stock")
     description = body.get("description")
+    shards = body.get("stockShards", 1)
 
     if not name:
         return response(400, {"message": "name es requerido"})
@@ -24,6 +31,8 @@ def handler(event, _context):
         return response(400, {"message": "price es requerido y debe ser >= 0"})
     if stock is None or stock < 0:
         return response(400, {"message": "stock es requerido y debe ser >= 0"})
+    if not isinstance(shards, int) or not 1 <= shards <= MAX_STOCK_SHARDS:
+        return response(400, {"message": f"stockShards debe estar entre 1 y {MAX_STOCK_SHARDS}"})
 
     product_id = new_id("prod")
     now = now_iso()
@@ -39,6 +48,20 @@ def handler(event, _context):
     }
 
     table = get_table("PRODUCTS_TABLE")
-    table.put_item(Item=to_decimal(item))
-    return response(201, {"productId": product_id, "name": name, "price": price, "stock": stock})
+    if shards == 1:
+        table.put_item(Item=to_decimal(item))
+        bump_catalog_version(tenant_id)
+        return response(201, {"productId": product_id, "name": name, "price": price, "stock": stock})
+
+    # Hot product: the stock lives in `shards` counter items next to the product.
+    del item["stock"]
+    item["stockShards"] = shards
+    with table.batch_writer() as batch:
+        for counter in shard_items(tenant_id, product_id, int(stock), shards):
+            batch.put_item(Item=counter)
+        batch.put_item(Item=to_decimal(item))
+    bump_catalog_version(tenant_id)
+    return response(
+        201, {"productId": product_id, "name": name, "price": price, "stock": stock, "stockShards": shards}
+    )
 
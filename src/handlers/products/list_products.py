@@ -1,17 +1,109 @@
-from boto3.dynamodb.conditions import Key
+import os
 
-from src.common.utils import get_table, get_tenant_from_event, response
+from boto3.dynamodb.conditions import Attr, Key
 
+from src.common.auth import authenticated
+from src.common.catalog import catalog_version, get_page, store_page
+from src.common.inventory import SHARD_SEPARATOR, aggregate_shards, attach_shard_stock
+from src.common.metrics import instrumented
+from src.common.utils import (
+    decode_cursor,
+    encode_cursor,
+    get_table,
+    get_tenant_from_event,
+    json_dumps,
+    query_all,
+    response,
+)
 
+DEFAULT_LIMIT = 100
+MAX_LIMIT = int(os.environ.get("LIST_PRODUCTS_MAX_LIMIT", "500"))
+MENU_PROJECTION = "productId, #name, price, description, createdAt, updatedAt"
+
+
+@instrumented
+@authenticated
 def handler(event, _context):
+    """
+    The tenant's menu, the whole catalog unless `limit` or `nextToken` ask for
+    a page. The menu is versioned by the tenant's `catalogVersion`: the
+    response carries an ETag, `If-None-Match` gets a 304 without reading the
+    products table, and each container reuses the serialized menu until the
+    version changes. Live stock is not part of the menu; `?stock=true` adds
+    it and skips the caching.
+    """
     tenant_id = get_tenant_from_event(event)
     if not tenant_id:
         return response(400, {"message": "tenantId es requerido"})
 
+    params = event.get("queryStringParameters") or {}
+    limit = None
+    if params.get("limit") or params.get("nextToken"):
+        try:
+            limit = min(int(params.get("limit") or DEFAULT_LIMIT), MAX_LIMIT)
+        except ValueError:
+            return response(400, {"message": "limit debe ser un entero"})
+        if limit <= 0:
+            return response(400, {"message": "limit debe ser > 0"})
+
+    start_key = None
+    if params.get("nextToken"):
+        start_key = decode_cursor(params["nextToken"])
+        if not start_key or start_key.get("tenantId") != tenant_id:
+            return response(400, {"message": "nextToken inválido"})
+
+    # Stock changes with every order, so only the menu is cached.
+    if (params.get("stock") or "").lower() == "true":
+        return response(200, _page(tenant_id, limit, start_key, with_stock=True))
+
+    version = catalog_version(tenant_id)
+    if version is None:
+        # Tenant without a catalog version yet: nothing to validate against.
+        return response(200, _page(tenant_id, limit, start_key))
+
+    etag = f'"{tenant_id}-v{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _if_none_match(event) & {etag, "*"}:
+        return response(304, "", headers)
+
+    cache_key = (tenant_id, version, limit, params.get("nextToken"))
+    body = get_page(cache_key)
+    if body is None:
+        body = json_dumps(_page(tenant_id, limit, start_key))
+        store_page(cache_key, body)
+    return response(200, body, headers)
+
+
+def _page(tenant_id: str, limit: int | None, start_key: dict | None, with_stock: bool = False) -> dict:
+    """One page of products, or all of them when `limit` is None."""
     table = get_table("PRODUCTS_TABLE")
-    result = table.query(
-        KeyConditionExpression=Key("tenantId").eq(tenant_id),
-        ScanIndexForward=True,
-    )
-    return response(200, {"items": result.get("Items", [])})
+    query = {"KeyConditionExpression": Key("tenantId").eq(tenant_id), "ScanIndexForward": True}
+    if limit is None and with_stock:
+        # Shard counters come in the same read and are folded into their product.
+        return {"items": aggregate_shards(list(query_all(table, **query)))}
+
+    # Shard counters live next to their product; they are not menu items.
+    query["FilterExpression"] = ~Attr("productId").contains(SHARD_SEPARATOR)
+    if not with_stock:
+        query["ProjectionExpression"] = MENU_PROJECTION
+        query["ExpressionAttributeNames"] = {"#name": "name"}
+    if limit is None:
+        return {"items": list(query_all(table, **query))}
+    query["Limit"] = limit
+    if start_key:
+        query["ExclusiveStartKey"] = start_key
+    result = table.query(**query)
+
+    items = result.get("Items", [])
+    if with_stock:
+        items = attach_shard_stock(table, tenant_id, items)
+    body = {"items": items}
+    if result.get("LastEvaluatedKey"):
+        body["nextToken"] = encode_cursor(result["LastEvaluatedKey"])
+    return body
+
 
+def _if_none_match(event) -> set[str]:
+    headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    tags = (headers.get("if-none-match") or "").split(",")
+    return {tag.strip().removeprefix("W/") for tag in tags if tag.strip()}
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from src.common.auth import authenticated
+from src.common.metrics import instrumented
+from src.common.utils import get_table, get_tenant_from_event, response
+from src.handlers.stats.updater import SUMMARY_KEY
+
+
+@instrumented
+@authenticated
+def handler(event, _context):
+    tenant_id = get_tenant_from_event(event)
+    if not tenant_id:
+        return response(400, {"message": "tenantId es requerido"})
+
+    item = (
+        get_table("TENANT_STATS_TABLE")
+        .get_item(Key={"tenantId": tenant_id, "statsKey": SUMMARY_KEY})
+        .get("Item")
+        or {}
+    )
+    counts = {
+        name.split("#", 1)[1]: value for name, value in item.items() if name.startswith("count#")
+    }
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    current = item.get("day") == today
+    return response(
+        200,
+        {
+            "tenantId": tenant_id,
+            "counts": counts,
+            "today": {
+                "date": today,
+                "orders": item.get("ordersToday", 0) if current else 0,
+                "revenue": item.get("revenueToday", 0) if current else 0,
+                "hourly": item.get("hourly", {}) if current else {},
+            },
+            "updatedAt": item.get("updatedAt"),
+        },
+    )
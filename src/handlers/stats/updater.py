@@ -0,0 +1,161 @@
+import os
+import time
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from src.common.metrics import instrumented
+from src.common.utils import get_table, now_iso, response, to_decimal
+
+# Order lifecycle; every event moves one order from the previous status to the
+# one it carries.
+ORDER_STATUSES = (
+    "placed",
+    "kitchen_in_progress",
+    "kitchen_done",
+    "packaging_in_progress",
+    "packaging_done",
+    "delivery_in_progress",
+    "delivered",
+)
+SUMMARY_KEY = "summary"
+EVENT_MARKER_TTL_SECONDS = int(os.environ.get("STATS_EVENT_MARKER_TTL_SECONDS", "86400"))
+
+
+@instrumented
+def handler(event, _context):
+    """
+    Keep the per-tenant stats item (`TenantStatsTable`, statsKey=summary) up
+    to date from `order.created` / `order.stage.*` bus events. Each status
+    transition of an order is applied once: a marker keyed by (orderId,
+    status) is written in the same transaction as the counters. Keying by the
+    EventBridge id would count a re-published event (a redelivered worker
+    message, a replayed create_order) twice.
+    """
+    detail = event.get("detail") or {}
+    detail_type = event.get("detail-type") or event.get("detailType")
+    tenant_id = detail.get("tenantId")
+    status = detail.get("status")
+    if not tenant_id or status not in ORDER_STATUSES:
+        return response(200, {"message": "Not an order status event"})
+    transition = f"{detail['orderId']}#{status}" if detail.get("orderId") else None
+
+    counts = {status: 1}
+    previous = ORDER_STATUSES.index(status) - 1
+    if detail_type != "order.created" and previous >= 0:
+        counts[ORDER_STATUSES[previous]] = -1
+
+    table = get_table("TENANT_STATS_TABLE")
+    if detail_type != "order.created":
+        applied = _apply(table, tenant_id, transition, _counts_update(counts))
+        return response(200, {"applied": applied})
+
+    # Creation also feeds today's revenue and hourly buckets (UTC). The item
+    # only keeps the current day: the first order of a new day resets them,
+    # and late events from a previous day only move the status counts.
+    created_at = detail.get("createdAt") or now_iso()
+    day, hour = created_at[:10], created_at[11:13]
+    amount = to_decimal(detail.get("totalAmount") or 0)
+    for update in (
+        _same_day_update(counts, day, hour, amount),
+        _new_day_update(counts, day, hour, amount),
+        _counts_update(counts),
+    ):
+        try:
+            return response(200, {"applied": _apply(table, tenant_id, transition, update)})
+        except _StaleDay:
+            continue
+    return response(200, {"applied": False})
+
+
+class _StaleDay(Exception):
+    pass
+
+
+def _counts_update(counts: dict, set_clauses=(), names=None, values=None, condition=None) -> dict:
+    names = dict(names or {})
+    values = dict(values or {})
+    adds = []
+    for index, (status, delta) in enumerate(counts.items()):
+        names[f"#c{index}"] = f"count#{status}"
+        values[f":c{index}"] = delta
+        adds.append(f"#c{index} :c{index}")
+    values[":now"] = now_iso()
+    expression = "SET " + ", ".join(["updatedAt = :now", *set_clauses]) + " ADD " + ", ".join(adds)
+    update = {
+        "UpdateExpression": expression,
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
+    if condition:
+        update["ConditionExpression"] = condition
+    return update
+
+
+def _same_day_update(counts: dict, day: str, hour: str, amount: Decimal) -> dict:
+    return _counts_update(
+        counts,
+        set_clauses=(
+            "revenueToday = revenueToday + :amount",
+            "ordersToday = ordersToday + :one",
+            "hourly.#hour = if_not_exists(hourly.#hour, :zero) + :one",
+        ),
+        names={"#day": "day", "#hour": hour},
+        values={":day": day, ":amount": amount, ":one": 1, ":zero": 0},
+        condition="#day = :day",
+    )
+
+
+def _new_day_update(counts: dict, day: str, hour: str, amount: Decimal) -> dict:
+    return _counts_update(
+        counts,
+        set_clauses=(
+            "#day = :day",
+            "revenueToday = :amount",
+            "ordersToday = :one",
+            "hourly = :hourly",
+        ),
+        names={"#day": "day"},
+        values={":day": day, ":amount": amount, ":one": 1, ":hourly": {hour: 1}},
+        condition="attribute_not_exists(#day) OR #day < :day",
+    )
+
+
+def _apply(table, tenant_id: str, transition: str | None, update: dict) -> bool:
+    """Run `update` on the summary item; False when the transition was already applied."""
+    client = table.meta.client
+    key = {"tenantId": tenant_id, "statsKey": SUMMARY_KEY}
+    if not transition:
+        try:
+            client.update_item(TableName=table.name, Key=key, **update)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise _StaleDay() from exc
+            raise
+        return True
+
+    marker = {
+        "Put": {
+            "TableName": table.name,
+            "Item": {
+                "tenantId": tenant_id,
+                "statsKey": f"transition#{transition}",
+                "expiresAt": int(time.time()) + EVENT_MARKER_TTL_SECONDS,
+            },
+            "ConditionExpression": "attribute_not_exists(statsKey)",
+        }
+    }
+    try:
+        client.transact_write_items(
+            TransactItems=[marker, {"Update": {"TableName": table.name, "Key": key, **update}}]
+        )
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        reasons = [reason.get("Code") for reason in exc.response.get("CancellationReasons") or []]
+        if reasons[:1] == ["ConditionalCheckFailed"]:
+            return False
+        if reasons[1:2] == ["ConditionalCheckFailed"]:
+            raise _StaleDay() from exc
+        raise
+    return True
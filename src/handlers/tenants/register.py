@@ -1,5 +1,6 @@
 import json
 
+from src.common.metrics import instrumented
 from src.common.utils import (
     get_table,
     new_id,
@@ -10,6 +11,7 @@ from src.common.utils import (
 )
 
 
+@instrumented
 def handler(event, _context):
     try:
         body = json.loads(event.get("body") or "{}")
@@ -1,6 +1,8 @@
+from src.common.metrics import instrumented
 from src.handlers.workflow.worker_base import process_stage
 
 
+@instrumented
 def handler(event, context):
     return process_stage(
         event,
@@ -1,15 +1,30 @@
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-from src.common.utils import get_table, now_iso, publish_event, response
+from botocore.exceptions import ClientError
+
+from src.common.logs import get_logger
+from src.common.utils import EventPublisher, EventPublishError, get_table, now_iso
+
+WORKER_MAX_CONCURRENCY = int(os.environ.get("WORKER_MAX_CONCURRENCY", "10"))
+
+logger = get_logger(__name__)
 
 
 def process_stage(event, stage_name: str, start_status: str, done_status: str):
     """
     Generic processor for each workflow stage. Called by kitchen/packaging/delivery
     workers that receive SQS events with Step Functions task tokens.
+
+    Records are isolated from each other: a failing record is reported in
+    `batchItemFailures` (SQS ReportBatchItemFailures) so only it is redelivered.
+    Stage updates run concurrently and all `order.stage.started` events of the
+    batch are published together.
     """
     table = get_table("ORDERS_TABLE")
     processed = []
+    tasks = []
 
     for record in event.get("Records", []):
         try:
@@ -36,9 +51,102 @@ def process_stage(event, stage_name: str, start_status: str, done_status: str):
             )
             continue
 
-        start_time = now_iso()
-        table.update_item(
-            Key={"tenantId": tenant_id, "orderId": order_id},
+        tasks.append(
+            {
+                "messageId": record.get("messageId"),
+                "tenantId": tenant_id,
+                "orderId": order_id,
+                "taskToken": task_token,
+                "actor": actor,
+            }
+        )
+
+    started = []
+    failures = []
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(len(tasks), WORKER_MAX_CONCURRENCY)) as pool:
+            futures = [
+                pool.submit(_start_stage, table, task, stage_name, start_status)
+                for task in tasks
+            ]
+        for task, future in zip(tasks, futures):
+            error = future.exception()
+            if error is not None:
+                logger.error("[%s] failed to start %s: %r", stage_name, task["orderId"], error)
+                failures.append(task)
+            elif future.result() is None:
+                # Redelivered after the stage completed: nothing left to start.
+                processed.append(
+                    {
+                        "orderId": task["orderId"],
+                        "tenantId": task["tenantId"],
+                        "status": "skipped",
+                        "reason": "Stage already completed",
+                        "stage": stage_name,
+                    }
+                )
+            else:
+                started.append((task, future.result()))
+
+    if started:
+        # Only the messages whose event never made it are redelivered; the
+        # stage update is a no-op once the stage is completed.
+        events = EventPublisher()
+        entries = {}
+        for task, start_time in started:
+            entry = events.add(
+                "order.stage.started",
+                {
+                    "tenantId": task["tenantId"],
+                    "orderId": task["orderId"],
+                    "stage": stage_name,
+                    "status": start_status,
+                    "startedAt": start_time,
+                    "actor": task["actor"],
+                },
+            )
+            entries[id(entry)] = task
+        try:
+            events.flush()
+        except EventPublishError as exc:
+            logger.error("[%s] %s", stage_name, exc)
+            unpublished = [entries[id(entry)] for entry in exc.entries]
+            failures.extend(unpublished)
+            started = [(task, start_time) for task, start_time in started if task not in unpublished]
+
+    for task, _ in started:
+        processed.append(
+            {
+                "orderId": task["orderId"],
+                "tenantId": task["tenantId"],
+                "status": "in_progress",
+                "stage": stage_name,
+            }
+        )
+    for task in failures:
+        processed.append(
+            {
+                "orderId": task["orderId"],
+                "tenantId": task["tenantId"],
+                "status": "failed",
+                "stage": stage_name,
+            }
+        )
+
+    return {
+        "batchItemFailures": [{"itemIdentifier": task["messageId"]} for task in failures],
+        "processed": processed,
+    }
+
+
+def _start_stage(table, task: dict, stage_name: str, start_status: str) -> str | None:
+    """Mark the stage in progress; None when it is already completed."""
+    # The low-level client is thread-safe; Table resources are not.
+    start_time = now_iso()
+    try:
+        table.meta.client.update_item(
+            TableName=table.name,
+            Key={"tenantId": task["tenantId"], "orderId": task["orderId"]},
             UpdateExpression=(
                 "SET #status = :orderStatus, "
                 "workflow.#stage.#stageStatus = :stageInProgress, "
@@ -47,6 +155,10 @@ def process_stage(event, stage_name: str, start_status: str, done_status: str):
                 "workflow.#stage.taskToken = :token, "
                 "updatedAt = :now"
             ),
+            # A completed stage has used its token; never reopen it.
+            ConditionExpression=(
+                "attribute_not_exists(workflow.#stage.#stageStatus) OR workflow.#stage.#stageStatus <> :completed"
+            ),
             ExpressionAttributeNames={
                 "#status": "status",
                 "#stage": stage_name,
@@ -56,31 +168,14 @@ def process_stage(event, stage_name: str, start_status: str, done_status: str):
                 ":orderStatus": start_status,
                 ":stageInProgress": "in_progress",
                 ":start": start_time,
-                ":actor": actor,
-                ":token": task_token,
+                ":actor": task["actor"],
+                ":token": task["taskToken"],
                 ":now": start_time,
+                ":completed": "completed",
             },
         )
-
-        publish_event(
-            "order.stage.started",
-            {
-                "tenantId": tenant_id,
-                "orderId": order_id,
-                "stage": stage_name,
-                "status": start_status,
-                "startedAt": start_time,
-                "actor": actor,
-            },
-        )
-
-        processed.append(
-            {
-                "orderId": order_id,
-                "tenantId": tenant_id,
-                "status": "in_progress",
-                "stage": stage_name,
-            }
-        )
-
-    return response(200, {"processed": processed})
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+    return start_time
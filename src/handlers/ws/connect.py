@@ -1,17 +1,27 @@
 import os
 import time
 
+from src.common.auth import ROLES
+from src.common.connection_registry import bump_version
+from src.common.metrics import instrumented
 from src.common.utils import get_table, now_iso, response
+from src.common.ws_frames import DEFAULT_FORMAT, FORMATS
 
 
+@instrumented
 def handler(event, _context):
     params = event.get("queryStringParameters") or {}
     tenant_id = params.get("tenantId")
     role = params.get("role") or "guest"
     user_id = params.get("userId")
+    frame_format = params.get("format") or DEFAULT_FORMAT
 
     if not tenant_id:
         return response(400, {"message": "tenantId is required"})
+    if role not in ROLES:
+        return response(400, {"message": f"role must be one of: {', '.join(ROLES)}"})
+    if frame_format not in FORMATS:
+        return response(400, {"message": f"format must be one of: {', '.join(FORMATS)}"})
 
     connection_id = event["requestContext"]["connectionId"]
     ttl_seconds = int(os.environ.get("CONNECTION_TTL_SECONDS", "3600"))
@@ -24,10 +34,12 @@ def handler(event, _context):
             "connectionId": connection_id,
             "role": role,
             "userId": user_id,
+            "format": frame_format,
             "connectedAt": now_iso(),
             "expiresAt": expires_at,
         }
     )
+    bump_version(tenant_id)
 
     return response(200, {"message": "connected", "connectionId": connection_id})
 
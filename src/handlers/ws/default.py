@@ -1,6 +1,8 @@
+from src.common.metrics import instrumented
 from src.common.utils import response
 
 
+@instrumented
 def handler(event, _context):
     return response(200, {"message": "Unsupported action", "input": event.get("body")})
 
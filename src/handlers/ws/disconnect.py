@@ -1,8 +1,11 @@
 from boto3.dynamodb.conditions import Key
 
+from src.common.connection_registry import bump_version
+from src.common.metrics import instrumented
 from src.common.utils import get_table, response
 
 
+@instrumented
 def handler(event, _context):
     connection_id = event["requestContext"]["connectionId"]
     table = get_table("CONNECTIONS_TABLE")
@@ -17,5 +20,6 @@ def handler(event, _context):
         table.delete_item(
             Key={"tenantId": item["tenantId"], "connectionId": connection_id}
         )
+        bump_version(item["tenantId"])
 
     return response(200, {"message": "disconnected"})
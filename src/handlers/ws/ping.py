@@ -3,9 +3,11 @@ import time
 
 from boto3.dynamodb.conditions import Key
 
+from src.common.metrics import instrumented
 from src.common.utils import get_table, response
 
 
+@instrumented
 def handler(event, _context):
     connection_id = event["requestContext"]["connectionId"]
     table = get_table("CONNECTIONS_TABLE")